@@ -0,0 +1,78 @@
+"""Shared setup for the scripts in this directory.
+
+Benchmarks run against an in-memory SQLite database and need no `.env`: the
+settings the app requires are given throwaway defaults before anything from
+`fastapi_todo_app` is imported.
+"""
+
+import os
+import tempfile
+import time
+
+# The app's own engine is configured from DATABASE_URL but never connects
+# here; benchmarks use memory_engine(). A file URL keeps pool_size valid.
+_UNUSED_DATABASE_URL = "sqlite+aiosqlite:///" + os.path.join(
+    tempfile.gettempdir(), "fastapi_todo_benchmark.db"
+)
+
+BENCHMARK_ENV = {
+    "DATABASE_URL": _UNUSED_DATABASE_URL,
+    "TEST_DATABASE_URL": _UNUSED_DATABASE_URL,
+    "SECRET_KEY": "benchmark-secret",
+    "ALGORITHM": "HS256",
+    "EXPIRY_TIME": "30",
+    "REFRESH_TOKEN_EXPIRY_TIME": "7",
+    "EMAIL_VERIFICATION_TOKEN_EXPIRY_TIME": "60",
+    "SMTP_HOST": "127.0.0.1",
+    "SMTP_PORT": "2525",
+    "SMTP_USER": "",
+    "SMTP_PASSWORD": "",
+    "SMTP_FROM_EMAIL": "benchmark@example.com",
+}
+
+for key, value in BENCHMARK_ENV.items():
+    os.environ.setdefault(key, value)
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+
+async def memory_engine() -> AsyncEngine:
+    """Create an in-memory SQLite engine with every app table."""
+    # Import every model so SQLModel.metadata describes the whole schema
+    import fastapi_todo_app.models.email_outbox  # noqa: F401
+    import fastapi_todo_app.models.forgot_password  # noqa: F401
+    import fastapi_todo_app.models.refresh_token_family  # noqa: F401
+    import fastapi_todo_app.models.todo_model  # noqa: F401
+    import fastapi_todo_app.models.two_factor_model  # noqa: F401
+    import fastapi_todo_app.models.user_model  # noqa: F401
+    import fastapi_todo_app.models.verification_model  # noqa: F401
+
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    return engine
+
+
+class StatementCounter:
+    """Count the statements an engine sends to the database."""
+
+    def __init__(self, engine: AsyncEngine):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+    def reset(self) -> None:
+        self.count = 0
+
+
+async def measure(fn, repeat: int) -> float:
+    """Await ``fn()`` ``repeat`` times and return the mean time in microseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - start) / repeat * 1e6
@@ -0,0 +1,380 @@
+"""Offline load test of the auth and todo endpoints.
+
+Runs the app in-process against a fresh SQLite file (or `--database-url`
+for a local Postgres) with a local SMTP sink standing in for the mail
+server, seeds users and todos, then drives each scenario with
+`--concurrency` workers until `--requests` operations have completed:
+
+    login        POST /token
+    login_2fa    POST /token, code read from the sink, POST /two-fa-confirm,
+                 POST /token
+    refresh      POST /token/refresh, rotating the refresh token each time
+    todos        POST /todos/, GET /todos/, PUT /todos/{id}, DELETE /todos/{id}
+    register     POST /user/register
+
+Throughput and p50/p95/p99 latency per request are printed, and written as
+JSON with `--output` so runs can be diffed between releases. Rate limiting
+is turned off so the limits are not what gets measured.
+
+    poetry run python -m benchmarks.load_test [--concurrency 8] [--requests 200]
+        [--scenarios login,refresh,todos] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import re
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from tests.smtp_sink import SMTPSink, message_text
+
+SCENARIOS = ("login", "login_2fa", "refresh", "todos", "register")
+PASSWORD = "load-test-password"
+TWO_FACTOR_CODE = re.compile(r"token is: (\S+)")
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Point the app at the local database and SMTP sink before it is imported."""
+    os.environ.update(
+        {
+            "DATABASE_URL": args.database_url,
+            "SMTP_HOST": "127.0.0.1",
+            "SMTP_PORT": str(args.smtp_port),
+            "SMTP_USER": "",
+            "SMTP_STARTTLS": "false",
+            "RATE_LIMIT_ENABLED": "false",
+            "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+        }
+    )
+    import benchmarks.common  # noqa: F401
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Latencies and failures per request, for one scenario."""
+
+    def __init__(self):
+        self.latencies: defaultdict[str, list[float]] = defaultdict(list)
+        self.errors: defaultdict[str, int] = defaultdict(int)
+
+    async def call(self, label: str, request, expected: int = 200):
+        start = time.perf_counter()
+        response = await request
+        elapsed = time.perf_counter() - start
+        if response.status_code != expected:
+            self.errors[label] += 1
+            raise RequestFailed(f"{label}: {response.status_code} {response.text[:200]}")
+        self.latencies[label].append(elapsed)
+        return response
+
+    def summary(self) -> dict:
+        requests = {}
+        for label in sorted(self.latencies.keys() | self.errors.keys()):
+            values = sorted(self.latencies[label])
+            requests[label] = {
+                "count": len(values),
+                "errors": self.errors[label],
+                "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0,
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2) if values else 0,
+            }
+        return requests
+
+
+class RequestFailed(Exception):
+    pass
+
+
+async def seed(users: int, two_factor_users: int, todos: int, tag: str):
+    """Insert verified users (some with 2FA on) and their todos directly."""
+    from fastapi_todo_app.db import async_session
+    from fastapi_todo_app.models.todo_model import Todo
+    from fastapi_todo_app.models.user_model import User
+    from fastapi_todo_app.services.auth import hash_password_async
+
+    hashed = await hash_password_async(PASSWORD)
+
+    def user(i: int, two_factor: bool) -> User:
+        name = f"lt{tag}{'f' if two_factor else 'u'}{i}"
+        return User(
+            name=name,
+            username=name,
+            email=f"{name}@example.com",
+            password=hashed,
+            is_verified=True,
+            is_two_factor_enabled=two_factor,
+        )
+
+    plain = [user(i, False) for i in range(users)]
+    two_factor = [user(i, True) for i in range(two_factor_users)]
+    async with async_session() as session:
+        session.add_all(plain + two_factor)
+        await session.commit()
+        session.add_all(
+            Todo(task=f"seeded todo {n}", user_id=u.id)
+            for u in plain
+            for n in range(todos)
+        )
+        await session.commit()
+    return plain, two_factor
+
+
+async def run_scenario(name: str, client, sink, users, concurrency: int, total: int):
+    recorder = Recorder()
+    remaining = total
+    completed = 0
+
+    def take() -> bool:
+        nonlocal remaining
+        if remaining <= 0:
+            return False
+        remaining -= 1
+        return True
+
+    async def login(user) -> dict:
+        response = await client.post(
+            "/token", data={"username": user.username, "password": PASSWORD}
+        )
+        return response.json()
+
+    async def worker(index: int) -> None:
+        nonlocal completed
+        user = users[index % len(users)]
+        state = {}
+        if name == "refresh":
+            state["refresh"] = (await login(user))["refresh_token"]
+        elif name == "todos":
+            token = (await login(user))["access_token"]
+            state["headers"] = {"Authorization": f"Bearer {token}"}
+
+        while take():
+            try:
+                await OPERATIONS[name](recorder, client, sink, user, state, index)
+                completed += 1
+            except RequestFailed:
+                pass
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    seconds = time.perf_counter() - start
+    return {
+        "operations": completed,
+        "failed_operations": total - completed,
+        "seconds": round(seconds, 3),
+        "throughput_per_s": round(completed / seconds, 2) if seconds else 0,
+        "requests": recorder.summary(),
+    }
+
+
+async def op_login(recorder, client, sink, user, state, index):
+    form = {"username": user.username, "password": PASSWORD}
+    await recorder.call("POST /token", client.post("/token", data=form))
+
+
+async def op_login_2fa(recorder, client, sink, user, state, index):
+    form = {"username": user.username, "password": PASSWORD}
+    await recorder.call("POST /token (send code)", client.post("/token", data=form))
+    start = time.perf_counter()
+    try:
+        message = await sink.next_message(user.email)
+    except asyncio.TimeoutError:
+        recorder.errors["email delivery (outbox to sink)"] += 1
+        raise RequestFailed("no 2FA email arrived")
+    recorder.latencies["email delivery (outbox to sink)"].append(
+        time.perf_counter() - start
+    )
+    code = TWO_FACTOR_CODE.search(message_text(message)).group(1)
+    await recorder.call(
+        "POST /two-fa-confirm",
+        client.post("/two-fa-confirm", json={"two_fa_code": code}),
+    )
+    response = await recorder.call(
+        "POST /token (confirmed)", client.post("/token", data=form)
+    )
+    if not response.json().get("access_token"):
+        recorder.errors["POST /token (confirmed)"] += 1
+        raise RequestFailed("2FA login returned no token")
+
+
+async def op_refresh(recorder, client, sink, user, state, index):
+    response = await recorder.call(
+        "POST /token/refresh",
+        client.post("/token/refresh", params={"old_refresh_token": state["refresh"]}),
+    )
+    state["refresh"] = response.json()["refresh_token"]
+
+
+async def op_todos(recorder, client, sink, user, state, index):
+    headers = state["headers"]
+    response = await recorder.call(
+        "POST /todos/",
+        client.post("/todos/", json={"task": "load test todo"}, headers=headers),
+        expected=201,
+    )
+    todo_id = response.json()["id"]
+    await recorder.call("GET /todos/", client.get("/todos/", headers=headers))
+    await recorder.call(
+        "PUT /todos/{id}",
+        client.put(
+            f"/todos/{todo_id}",
+            json={"task": "load test todo", "is_completed": True},
+            headers=headers,
+        ),
+    )
+    await recorder.call(
+        "DELETE /todos/{id}",
+        client.delete(f"/todos/{todo_id}", headers=headers),
+        expected=202,
+    )
+
+
+async def op_register(recorder, client, sink, user, state, index):
+    name = f"lr{uuid.uuid4().hex[:12]}"
+    await recorder.call(
+        "POST /user/register",
+        client.post(
+            "/user/register",
+            params={
+                "name": name,
+                "username": name,
+                "email": f"{name}@example.com",
+                "password": PASSWORD,
+            },
+        ),
+    )
+    # Verification emails are not read; don't keep them around
+    sink.discard(f"{name}@example.com")
+
+
+OPERATIONS = {
+    "login": op_login,
+    "login_2fa": op_login_2fa,
+    "refresh": op_refresh,
+    "todos": op_todos,
+    "register": op_register,
+}
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import httpx
+
+    from fastapi_todo_app.main import app
+
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    sink = SMTPSink(port=args.smtp_port).start()
+    tag = uuid.uuid4().hex[:6]
+    results = {}
+    try:
+        async with app.router.lifespan_context(app):
+            users, two_factor_users = await seed(
+                args.users, args.concurrency, args.todos, tag
+            )
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://load-test", timeout=60
+            ) as client:
+                for name in args.scenarios:
+                    pool = two_factor_users if name == "login_2fa" else users
+                    results[name] = await run_scenario(
+                        name, client, sink, pool, args.concurrency, args.requests
+                    )
+    finally:
+        sink.stop()
+
+    return {
+        "meta": {
+            "started_at": started_at,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": args.database_url.split(":", 1)[0],
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "users": args.users,
+            "todos_per_user": args.todos,
+            "emails_delivered": sink.delivered,
+        },
+        "scenarios": results,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{'scenario / request':<40}{'ops/s':>9}{'count':>7}{'err':>5}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    )
+    for name, result in report["scenarios"].items():
+        print(
+            f"{name:<40}{result['throughput_per_s']:>9.1f}"
+            f"{result['operations']:>7}{result['failed_operations']:>5}"
+        )
+        for label, stats in result["requests"].items():
+            print(
+                f"  {label:<38}{'':>9}{stats['count']:>7}{stats['errors']:>5}"
+                f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="per scenario")
+    parser.add_argument(
+        "--scenarios",
+        type=lambda value: value.split(","),
+        default=list(SCENARIOS),
+        help="comma-separated, from: " + ", ".join(SCENARIOS),
+    )
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--todos", type=int, default=20, help="seeded per user")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="defaults to a fresh SQLite file in the temp directory",
+    )
+    parser.add_argument("--smtp-port", type=int, default=0, help="0 picks a free port")
+    parser.add_argument("--output", help="also write the results as JSON here")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.database_url is None:
+        path = os.path.join(tempfile.gettempdir(), "fastapi_todo_load_test.db")
+        if os.path.exists(path):
+            os.remove(path)
+        args.database_url = "sqlite+aiosqlite:///" + path
+    if args.smtp_port == 0:
+        args.smtp_port = free_port()
+
+    configure_environment(args)
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+        print(f"Wrote {args.output}", file=sys.stderr)
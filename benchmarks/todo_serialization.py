@@ -0,0 +1,81 @@
+"""Cost of turning a page of todos into a response body.
+
+Compares the previous path for GET /todos/ (ORM rows returned under
+`response_model`, validated by FastAPI, encoded by `jsonable_encoder` and
+rendered with the stdlib `json`) with the current one (column tuples turned
+into dicts and rendered by `ORJSONResponse`). Only serialization is timed;
+the rows are loaded once up front.
+
+    poetry run python -m benchmarks.todo_serialization [--todos 1000] [--repeat 50]
+"""
+
+import argparse
+import asyncio
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_cloned_field, create_model_field
+from pydantic import BaseModel
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.common import measure, memory_engine
+from fastapi_todo_app.main import TODO_COLUMNS, todo_row_json
+from fastapi_todo_app.models.todo_model import Todo
+from fastapi_todo_app.models.user_model import User
+
+
+class OldTodoPage(BaseModel):
+    """TodoPage as it was, with table models as items."""
+
+    items: list[Todo]
+    next_cursor: int | None = None
+
+
+async def main(todos: int, repeat: int) -> None:
+    engine = await memory_engine()
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user = User(
+            name="bench", username="bench", email="bench@example.com", password="x" * 60
+        )
+        session.add(user)
+        await session.commit()
+        session.add_all(
+            Todo(task=f"todo number {i}", user_id=user.id) for i in range(todos)
+        )
+        await session.commit()
+        rows = (await session.exec(select(Todo).where(Todo.user_id == user.id))).all()
+        statement = select(*TODO_COLUMNS).where(Todo.user_id == user.id)
+        tuples = (await session.exec(statement)).all()
+
+    # What FastAPI builds for `response_model=OldTodoPage`
+    field = create_cloned_field(create_model_field("Response", OldTodoPage))
+
+    async def before():
+        page = OldTodoPage(items=rows, next_cursor=None)
+        content = await serialize_response(field=field, response_content=page)
+        return JSONResponse(content).body
+
+    async def after():
+        content = {"items": [todo_row_json(row) for row in tuples], "next_cursor": None}
+        return ORJSONResponse(content).body
+
+    assert len(await before()) > 0 and len(await after()) > 0
+    per_k = 1000 / todos
+    print(f"{'path':<34}{'us/page':>10}{'us/1k todos':>13}")
+    for name, fn in (
+        ("response_model + json (before)", before),
+        ("column tuples + orjson (after)", after),
+    ):
+        elapsed = await measure(fn, repeat)
+        print(f"{name:<34}{elapsed:>10.0f}{elapsed * per_k:>13.0f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--todos", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.todos, args.repeat))
@@ -0,0 +1,86 @@
+"""Encode and decode throughput of each JWT backend.
+
+Runs `TokenCodec` with every installed backend for HS256, RS256 and ES256,
+plus python-jose called the way it was before (key parsed on every call)
+as a baseline.
+
+    poetry run python -m benchmarks.token_codec [--repeat 2000]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwt
+
+import benchmarks.common  # noqa: F401
+from fastapi_todo_app.services.signing_keys import KeyRing
+from fastapi_todo_app.services.token_codec import BACKENDS, create_codec
+
+SECRET = "benchmark-secret-benchmark-secret"
+
+
+def private_pem(key) -> str:
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def key_rings() -> dict[str, KeyRing]:
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    return {
+        "HS256": KeyRing("HS256", secret=SECRET),
+        "RS256": KeyRing("RS256", private_key_pem=private_pem(rsa_key)),
+        "ES256": KeyRing("ES256", private_key_pem=private_pem(ec_key)),
+    }
+
+
+def ops_per_second(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return repeat / (time.perf_counter() - start)
+
+
+def main(repeat: int) -> None:
+    claims = {
+        "sub": "user@example.com",
+        "uid": 42,
+        "role": "user",
+        "ver": 0,
+        "exp": datetime.now(timezone.utc) + timedelta(minutes=30),
+    }
+    print(f"{'algorithm':<11}{'backend':<18}{'encode/s':>10}{'decode/s':>10}")
+    for algorithm, ring in key_rings().items():
+        # The old call pattern: key material handed over as text every time
+        material = ring.signing_material
+        verify = next(iter(ring.verify_material.values()))
+        token = jwt.encode(claims, material, algorithm)
+        encode = ops_per_second(lambda: jwt.encode(claims, material, algorithm), repeat)
+        decode = ops_per_second(
+            lambda: jwt.decode(token, verify, algorithms=[algorithm]), repeat
+        )
+        print(f"{algorithm:<11}{'jose (per call)':<18}{encode:>10.0f}{decode:>10.0f}")
+
+        for name in BACKENDS:
+            try:
+                codec = create_codec(ring, name)
+            except RuntimeError as error:
+                print(f"{algorithm:<11}{name:<18}  skipped: {error}")
+                continue
+            token = codec.encode(claims)
+            encode = ops_per_second(lambda: codec.encode(claims), repeat)
+            decode = ops_per_second(lambda: codec.decode(token), repeat)
+            print(f"{algorithm:<11}{name:<18}{encode:>10.0f}{decode:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.repeat)
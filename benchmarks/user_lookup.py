@@ -0,0 +1,86 @@
+"""Round trips and latency of username-or-email user lookups.
+
+Compares the previous two-query `get_user_from_db` (username first, then
+email) with `lookup_user` and `lookup_users`.
+
+    poetry run python -m benchmarks.user_lookup [--users 1000] [--repeat 200]
+"""
+
+import argparse
+import asyncio
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from benchmarks.common import StatementCounter, measure, memory_engine
+from fastapi_todo_app.models.user_model import User
+from fastapi_todo_app.services.auth import lookup_user, lookup_users
+
+
+async def two_query_lookup(session: AsyncSession, username=None, email=None):
+    """The lookup as it was before: a username SELECT, then an email SELECT."""
+    user = (await session.exec(select(User).where(User.username == username))).first()
+    if not user and email:
+        user = (await session.exec(select(User).where(User.email == email))).first()
+    return user
+
+
+async def main(users: int, repeat: int) -> None:
+    engine = await memory_engine()
+    async with AsyncSession(engine) as session:
+        session.add_all(
+            User(
+                name=f"user {i}",
+                username=f"user{i}",
+                email=f"user{i}@example.com",
+                password="x" * 60,
+            )
+            for i in range(users)
+        )
+        await session.commit()
+
+    counter = StatementCounter(engine)
+    cases = {
+        "username hit": {"username": "user7", "email": "user7"},
+        "email hit": {"username": "user7@example.com", "email": "user7@example.com"},
+        "miss": {"username": "nobody", "email": "nobody@example.com"},
+    }
+    print(f"{'case':<16}{'implementation':<18}{'round trips':>12}{'us/call':>10}")
+    async with AsyncSession(engine) as session:
+        for case, kwargs in cases.items():
+            for name, fn in (("two queries", two_query_lookup), ("lookup_user", lookup_user)):
+                counter.reset()
+                await fn(session, **kwargs)
+                trips = counter.count
+                elapsed = await measure(lambda: fn(session, **kwargs), repeat)
+                print(f"{case:<16}{name:<18}{trips:>12}{elapsed:>10.0f}")
+
+        identifiers = [f"user{i}" for i in range(0, users, 2)][:50]
+        identifiers += [f"user{i}@example.com" for i in range(1, users, 2)][:50]
+
+        async def one_by_one():
+            for identifier in identifiers:
+                await lookup_user(session, username=identifier, email=identifier)
+
+        counter.reset()
+        await one_by_one()
+        trips = counter.count
+        elapsed = await measure(one_by_one, max(repeat // 20, 1))
+        print(f"{'batch of 100':<16}{'lookup_user x100':<18}{trips:>12}{elapsed:>10.0f}")
+
+        counter.reset()
+        resolved = await lookup_users(session, identifiers)
+        trips = counter.count
+        elapsed = await measure(lambda: lookup_users(session, identifiers), repeat)
+        print(f"{'batch of 100':<16}{'lookup_users':<18}{trips:>12}{elapsed:>10.0f}")
+        assert len(resolved) == len(identifiers)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.repeat))
@@ -1,18 +1,61 @@
-from sqlmodel import Session, SQLModel, create_engine
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from fastapi_todo_app import settings
+from fastapi_todo_app.services.metrics import db_pool_checkout_wait, registry
+from fastapi_todo_app.services.sql_instrumentation import query_monitor
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Records how long each checkout waits for (or opens) a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - start)
+
 
 connection_string: str = str(settings.DATABASE_URL).replace(
     "postgresql", "postgresql+psycopg"
 )
-# engine = create_engine(connection_string, connect_args={"sslmode": "require"} , echo=True, pool_recycle=300, pool_size=5)
-engine = create_engine(connection_string, echo=True, pool_recycle=300, pool_size=5)
+# engine = create_async_engine(connection_string, connect_args={"sslmode": "require"} , echo=True, pool_recycle=300, pool_size=5)
+engine = create_async_engine(
+    connection_string,
+    echo=settings.DB_ECHO,
+    pool_recycle=300,
+    pool_size=5,
+    poolclass=TimedQueuePool,
+)
+query_monitor.install()
+registry.gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    function=lambda: engine.pool.checkedout(),
+)
+
+# expire_on_commit is disabled so attributes stay readable after commit
+# without triggering an implicit (and, under asyncio, illegal) lazy load.
+async_session = async_sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
 
 
-def create_tables():
-    SQLModel.metadata.create_all(engine)
+async def create_tables():
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
 
 
-def get_session():
-    with Session(engine) as session:
+async def get_session():
+    async with async_session() as session:
         yield session
+
+
+def get_session_factory():
+    """For work that outlives the request's session, such as streamed responses."""
+    return async_session
@@ -8,26 +8,37 @@
 # Step-8: Create contex manager for app lifespan
 # Step-9: Create all endpoints of todo app
 
+import csv
+import io
+import json
+import logging
 from contextlib import asynccontextmanager
-from datetime import datetime, timedelta, timezone
-from typing import Annotated, AsyncGenerator
+from typing import Annotated, AsyncGenerator, Literal
 
-from fastapi import Depends, FastAPI, HTTPException, Response
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 
 # from sqlalchemy import and_
-from sqlmodel import Session, col, select
+from sqlalchemy import bindparam, delete, event, func, insert, update
+from sqlalchemy.orm import Session
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from fastapi_todo_app.db import create_tables, get_session
+from fastapi_todo_app.db import create_tables, get_session, get_session_factory
 from fastapi_todo_app.models.todo_model import Todo
-from fastapi_todo_app.models.two_factor_model import (
-    TwoFactorConfirmation,
-    TwoFactorToken,
-)
 from fastapi_todo_app.models.user_model import User
 from fastapi_todo_app.router import user_router
-from fastapi_todo_app.schemas.todo_schema import Todo_Create, Todo_Edit
+from fastapi_todo_app.schemas.todo_schema import (
+    Todo_Create,
+    Todo_Edit,
+    TodoBulkItemResult,
+    TodoBulkRequest,
+    TodoBulkResponse,
+    TodoPage,
+    TodoRead,
+)
 from fastapi_todo_app.schemas.user_schema import (
     LoginRequest,
     LoginResponse,
@@ -38,18 +49,37 @@ from fastapi_todo_app.services.auth import (
     authenticate_user,
     create_access_token,
     create_credentials_exception,
-    create_refresh_token,
-    generate_two_factor_token,
-    get_current_user,
-    validate_refresh_token,
+    get_current_principal,
+)
+from fastapi_todo_app.services.conditional import etag_matches
+from fastapi_todo_app.services.email_outbox import enqueue_email, outbox_dispatcher
+from fastapi_todo_app.services.email_service import smtp_pool
+from fastapi_todo_app.services.metrics import MetricsMiddleware, registry
+from fastapi_todo_app.services.password_pool import password_pool
+from fastapi_todo_app.services.principal import UserPrincipal, todos_versions
+from fastapi_todo_app.services.rate_limit import rate_limit
+from fastapi_todo_app.services.refresh_tokens import (
+    revocation_list,
+    rotate_refresh_token,
+    start_refresh_family,
 )
-from fastapi_todo_app.services.email_service import send_two_factor_email
+from fastapi_todo_app.services.signing_keys import key_ring
+from fastapi_todo_app.services.sql_instrumentation import ServerTimingMiddleware
+from fastapi_todo_app.services.structured_logging import log_pipeline
+from fastapi_todo_app.services.token_sweeper import token_sweeper
+from fastapi_todo_app.services.two_factor import two_factor_codes
 from fastapi_todo_app.settings import (
-    EXPIRY_TIME,
     FRONTEND_URL,
-    REFRESH_TOKEN_EXPIRY_TIME,
+    JWKS_MAX_AGE,
+    METRICS_ENABLED,
+    TODO_BULK_MAX_ITEMS,
+    TODO_EXPORT_BATCH_SIZE,
+    TODO_PAGE_DEFAULT_LIMIT,
+    TODO_PAGE_MAX_LIMIT,
 )
 
+logger = logging.getLogger(__name__)
+
 origins = [
     FRONTEND_URL,
     "http://localhost:3000",
@@ -58,8 +88,20 @@ origins = [
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    create_tables()
+    log_pipeline.start()
+    logger.info("Frontend URL: %s", FRONTEND_URL)
+    await create_tables()
+    outbox_dispatcher.start()
+    token_sweeper.start()
+    revocation_list.start()
     yield
+    await revocation_list.stop()
+    await token_sweeper.stop()
+    await outbox_dispatcher.stop()
+    await two_factor_codes.close()
+    password_pool.shutdown()
+    smtp_pool.close()
+    log_pipeline.stop()
 
 
 app: FastAPI = FastAPI(
@@ -68,8 +110,12 @@ app: FastAPI = FastAPI(
     description="A simple todo app built with FastAPI",
     version="0.1.0",
     swagger_ui_parameters={"syntaxHighlight.theme": "obsidian"},
+    default_response_class=ORJSONResponse,
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+app.add_middleware(ServerTimingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -80,7 +126,6 @@ app.add_middleware(
 
 
 app.include_router(router=user_router.user_router)
-print(f"Frontend URL: {FRONTEND_URL}")
 
 
 @app.get("/")
@@ -88,37 +133,47 @@ def root():
     return {"message": "Hello World"}
 
 
+@app.get("/.well-known/jwks.json")
+def jwks(if_none_match: Annotated[str | None, Header()] = None):
+    """Public keys that verify our tokens, for services checking them offline.
+
+    Empty when tokens are signed with a shared secret.
+    """
+    headers = {
+        "ETag": key_ring.jwks_etag,
+        "Cache-Control": f"public, max-age={JWKS_MAX_AGE}",
+    }
+    if etag_matches(if_none_match, key_ring.jwks_etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=key_ring.jwks_json, media_type="application/json", headers=headers
+    )
+
+
+@app.get("/metrics", include_in_schema=METRICS_ENABLED)
+def metrics():
+    """Request latency and auth-path timings in the Prometheus text format."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(
+        content=registry.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
 @app.post("/two-fa-confirm", response_model=LoginResponse)
 async def check_two_factor_confirmation(
     request: TwoFactorRequest,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
     token = request.two_fa_code  # Get the code from the request body
-    statement = select(TwoFactorToken).where(TwoFactorToken.token == token)
-    token_record = session.exec(statement).first()
+    user_id = await two_factor_codes.redeem_code(session, token)
 
-    if not token_record:
-        raise HTTPException(status_code=404, detail="Invalid 2FA code")
-
-    token_expires = token_record.expires.replace(tzinfo=timezone.utc)
-    if token_expires < datetime.now(timezone.utc):
-        session.delete(token_record)
-        session.commit()
-        raise HTTPException(status_code=400, detail="2FA code has expired")
-
-    statement = select(User).where(User.id == token_record.user_id)
-    user = session.exec(statement).first()
+    statement = select(User).where(User.id == user_id)
+    user = (await session.exec(statement)).first()
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    two_factor_confirmation = TwoFactorConfirmation(
-        expires=datetime.now() + timedelta(minutes=10), user_id=user.id
-    )
-    session.delete(token_record)
-    session.add(two_factor_confirmation)
-    session.commit()
-
     return LoginResponse(
         success=True,
         message="2FA verified successfully",
@@ -128,16 +183,21 @@ async def check_two_factor_confirmation(
     )
 
 
-@app.post("/token", response_model=LoginResponse)
+@app.post(
+    "/token",
+    response_model=LoginResponse,
+    dependencies=[Depends(rate_limit("token", account_field="username"))],
+)
 async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
-    print("🚀 ~ file: main.py:134 ~ form_data:", form_data.username, form_data.password)
     try:
-        user = authenticate_user(form_data.username, form_data.password, session)
+        user = await authenticate_user(form_data.username, form_data.password, session)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error authenticating user: {str(e)}")
+        logger.info("Login failed for %s: %s", form_data.username, e)
         raise create_credentials_exception(str(e))
 
     if not user:
@@ -150,63 +210,31 @@ async def login(
         )
 
     if user.is_two_factor_enabled:
-        statement = select(TwoFactorConfirmation).where(
-            TwoFactorConfirmation.user_id == user.id
-        )
-        two_factor_confirmation = session.exec(statement).all()
-
-        if len(two_factor_confirmation) == 0:
-            statement = select(TwoFactorToken).where(TwoFactorToken.user_id == user.id)
-            two_factor_tokens = session.exec(statement).all()
-            if len(two_factor_tokens) > 0:
-                for token in two_factor_tokens:
-                    session.delete(token)
-                session.commit()
-            token = generate_two_factor_token()
-            expires = datetime.now(timezone.utc) + timedelta(minutes=10)
-
-            # Save token to database
-            two_factor_token = TwoFactorToken(
-                token=token, expires=expires, user_id=user.id
-            )
-            session.add(two_factor_token)
-            session.commit()
+        confirmation = await two_factor_codes.take_confirmation(session, user.id)
 
-            # Send token via email
-            await send_two_factor_email(user.email, token)
+        if confirmation is None:
+            # Issue a code, replacing any earlier one
+            token = await two_factor_codes.issue_code(session, user.id)
+            # Queue the token email in the same transaction as the token
+            enqueue_email(session, "two_factor", user.email, token, user.id)
+            await session.commit()
+            outbox_dispatcher.notify()
 
             return LoginResponse(
                 success=True,
                 message="2FA code sent to your email",
             )
 
-        expired_confirmations = [
-            conf for conf in two_factor_confirmation if datetime.now() > conf.expires
-        ]
-        valid_confirmations = [
-            conf for conf in two_factor_confirmation if datetime.now() <= conf.expires
-        ]
-        if expired_confirmations and len(valid_confirmations) == 0:
-            for conf in expired_confirmations:
-                session.delete(conf)
-            session.commit()
+        if not confirmation:
             return LoginResponse(
                 success=False,
                 message="2FA code confirmation has expired, please login again",
             )
 
-        # Clean up all confirmations
-        for conf in two_factor_confirmation:
-            session.delete(conf)
-        session.commit()
-
     # Generate tokens
-    access_token = create_access_token(
-        {"sub": user.email}, timedelta(minutes=float(str(EXPIRY_TIME)))
-    )
-    refresh_token = create_refresh_token(
-        {"sub": user.email}, timedelta(days=int(str(REFRESH_TOKEN_EXPIRY_TIME)))
-    )
+    access_token = create_access_token({"sub": user.email}, user=user)
+    refresh_token = start_refresh_family(session, user)
+    await session.commit()
 
     return LoginResponse(
         success=True,
@@ -220,26 +248,89 @@ async def login(
 @app.post("/token/refresh", response_model=Token)
 async def refresh_token(
     old_refresh_token: str,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
-    user = validate_refresh_token(old_refresh_token, session)
-    if not user:
-        raise create_credentials_exception("Invalid credentials")
-    expiry_time = timedelta(minutes=float(str(EXPIRY_TIME)))
-    access_token = create_access_token({"sub": user.username}, expiry_time)
-    expiry_time = timedelta(days=int(str(REFRESH_TOKEN_EXPIRY_TIME)))
-    refresh_token = create_refresh_token({"sub": user.email}, expiry_time)
+    user, refresh_token = await rotate_refresh_token(session, old_refresh_token)
+    access_token = create_access_token({"sub": user.username}, user=user)
     return Token(
         access_token=access_token, token_type="bearer", refresh_token=refresh_token
     )
 
 
-@app.post("/todos/", response_model=Todo)
+# Session.info key of the users whose todos_version the transaction bumped
+BUMPED_TODOS_VERSIONS = "bumped_todos_versions"
+
+
+async def get_todos_version(session: AsyncSession, user_id: int) -> int | None:
+    """Return a user's current todos_version, cached for a short while."""
+    version = todos_versions.get(user_id)
+    if version is None:
+        statement = select(User.todos_version).where(User.id == user_id)
+        version = (await session.exec(statement)).first()
+        if version is not None:
+            todos_versions.set(user_id, version)
+    return version
+
+
+async def bump_todos_version(session: AsyncSession, user_id: int) -> None:
+    """Invalidate the ETags of a user's todo list, in the caller's transaction.
+
+    The cached version is dropped now and again once the transaction has
+    committed, so a list read racing the commit cannot keep the old one.
+    """
+    await session.exec(
+        update(User)
+        .where(col(User.id) == user_id)
+        .values(todos_version=User.todos_version + 1)
+    )
+    todos_versions.invalidate(user_id)
+    session.sync_session.info.setdefault(BUMPED_TODOS_VERSIONS, set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def forget_bumped_todos_versions(session: Session) -> None:
+    for user_id in session.info.pop(BUMPED_TODOS_VERSIONS, ()):
+        todos_versions.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_bumped_todos_versions(session: Session) -> None:
+    session.info.pop(BUMPED_TODOS_VERSIONS, None)
+
+
+# Clients may keep todo reads but must revalidate them on every use
+REVALIDATE = {"Cache-Control": "private, no-cache"}
+
+
+# Field order of TodoRead; the hot todo routes select these columns and
+# return ORJSONResponse directly, skipping response_model validation.
+TODO_FIELDS = tuple(TodoRead.model_fields)
+TODO_COLUMNS = tuple(getattr(Todo, field) for field in TODO_FIELDS)
+
+
+def todo_json(todo: Todo) -> dict:
+    return {field: getattr(todo, field) for field in TODO_FIELDS}
+
+
+def todo_row_json(row) -> dict:
+    # Zipping the row as a tuple is several times faster than reading its
+    # attributes by name
+    return dict(zip(TODO_FIELDS, row))
+
+
+def todo_etag(todo: Todo) -> str:
+    return f'"todo-{todo.id}-{todo.version}"'
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **REVALIDATE})
+
+
+@app.post("/todos/", response_model=TodoRead, status_code=201)
 async def create_todo(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_principal)],
     todo: Todo_Create,
-    session: Annotated[Session, Depends(get_session)],
-    response: Response,
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     if not current_user:
         raise HTTPException(status_code=401, detail="Not authenticated")
@@ -250,63 +341,252 @@ async def create_todo(
         user_id=current_user.id,  # Set the user_id from the authenticated user
     )
     session.add(new_todo)
-    session.commit()
-    session.refresh(new_todo)
-    response.status_code = 201
-    return new_todo
+    await bump_todos_version(session, current_user.id)
+    await session.commit()
+    await session.refresh(new_todo)
+    return ORJSONResponse(
+        todo_json(new_todo), status_code=201, headers={"ETag": todo_etag(new_todo)}
+    )
 
 
-@app.get("/todos/", response_model=list[Todo])
+@app.get("/todos/", response_model=TodoPage)
 async def get_all_todos(
-    current_user: Annotated[User, Depends(get_current_user)],
-    session: Annotated[Session, Depends(get_session)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_principal)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    limit: Annotated[
+        int, Query(ge=1, le=TODO_PAGE_MAX_LIMIT)
+    ] = TODO_PAGE_DEFAULT_LIMIT,
+    cursor: int | None = None,
+    is_completed: bool | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
-    statement = (
-        select(Todo).where(Todo.user_id == current_user.id).order_by(col(Todo.id))
-    )
-    todos = session.exec(statement).all()
-    if todos:
-        return todos
-    else:
+    # The cached list version decides whether the client's copy is current;
+    # the page itself is only read and serialized when it is not.
+    version = await get_todos_version(session, current_user.id)
+    etag = f'"todos-{current_user.id}-{version}-{limit}-{cursor}-{is_completed}"'
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    # Keyset pagination on (user_id, id): every page is an index range scan,
+    # however many todos the user has.
+    statement = select(*TODO_COLUMNS).where(Todo.user_id == current_user.id)
+    if cursor is not None:
+        statement = statement.where(Todo.id > cursor)
+    if is_completed is not None:
+        statement = statement.where(Todo.is_completed == is_completed)
+    statement = statement.order_by(col(Todo.id)).limit(limit + 1)
+    todos = list((await session.exec(statement)).all())
+
+    next_cursor = None
+    if len(todos) > limit:
+        todos = todos[:limit]
+        next_cursor = todos[-1].id
+    if not todos and cursor is None:
         raise HTTPException(status_code=404, detail="No todos found")
+    return ORJSONResponse(
+        {"items": [todo_row_json(row) for row in todos], "next_cursor": next_cursor},
+        headers={"ETag": etag, **REVALIDATE},
+    )
 
 
-@app.get("/todos/{id}", response_model=Todo)
+@app.post("/todos/bulk", response_model=TodoBulkResponse)
+async def bulk_todos(
+    request: TodoBulkRequest,
+    current_user: Annotated[UserPrincipal, Depends(get_current_principal)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+):
+    """Apply many creates, patches and deletes in one transaction.
+
+    Each kind of change is a single multi-row statement scoped to the
+    current user; ids that do not exist or belong to someone else are
+    reported as not_found rather than failing the whole batch.
+    """
+    total = len(request.create) + len(request.update) + len(request.delete)
+    if total > TODO_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A bulk request may contain at most {TODO_BULK_MAX_ITEMS} items",
+        )
+
+    changed = False
+    created: list[dict] = []
+    if request.create:
+        statement = insert(Todo).returning(Todo, sort_by_parameter_order=True)
+        rows = [{"task": todo.task, "user_id": current_user.id} for todo in request.create]
+        result = await session.exec(statement, params=rows)
+        created = [todo_json(todo) for todo in result.scalars().all()]
+        changed = True
+
+    updated: list[TodoBulkItemResult] = []
+    if request.update:
+        ids = {patch.id for patch in request.update}
+        statement = (
+            select(Todo.id)
+            .where(Todo.user_id == current_user.id)
+            .where(col(Todo.id).in_(ids))
+        )
+        owned = set((await session.exec(statement)).all())
+        if owned:
+            table = Todo.__table__
+            statement = (
+                update(table)
+                .where(table.c.user_id == current_user.id)
+                .where(table.c.id == bindparam("b_id"))
+                .values(
+                    task=func.coalesce(
+                        bindparam("b_task", type_=table.c.task.type), table.c.task
+                    ),
+                    is_completed=func.coalesce(
+                        bindparam("b_is_completed", type_=table.c.is_completed.type),
+                        table.c.is_completed,
+                    ),
+                    version=table.c.version + 1,
+                )
+            )
+            await session.exec(
+                statement,
+                params=[
+                    {"b_id": p.id, "b_task": p.task, "b_is_completed": p.is_completed}
+                    for p in request.update
+                    if p.id in owned
+                ],
+            )
+            statement = (
+                select(Todo)
+                .where(Todo.user_id == current_user.id)
+                .where(col(Todo.id).in_(owned))
+                .execution_options(populate_existing=True)
+            )
+            todos = {todo.id: todo for todo in (await session.exec(statement)).all()}
+            changed = True
+        for patch in request.update:
+            if patch.id in owned:
+                updated.append(
+                    TodoBulkItemResult(
+                        id=patch.id, status="updated", todo=todo_json(todos[patch.id])
+                    )
+                )
+            else:
+                updated.append(TodoBulkItemResult(id=patch.id, status="not_found"))
+
+    deleted: list[TodoBulkItemResult] = []
+    if request.delete:
+        statement = (
+            delete(Todo)
+            .where(Todo.user_id == current_user.id)
+            .where(col(Todo.id).in_(request.delete))
+            .returning(Todo.id)
+        )
+        removed = set((await session.exec(statement)).scalars().all())
+        changed = changed or bool(removed)
+        deleted = [
+            TodoBulkItemResult(
+                id=todo_id, status="deleted" if todo_id in removed else "not_found"
+            )
+            for todo_id in request.delete
+        ]
+
+    if changed:
+        await bump_todos_version(session, current_user.id)
+    await session.commit()
+    return TodoBulkResponse(created=created, updated=updated, deleted=deleted)
+
+
+EXPORT_COLUMNS = ("id", "task", "is_completed", "user_id")
+
+
+async def stream_todos(session_factory, user_id: int, fmt: str):
+    """Yield a user's todos batch by batch from a server-side cursor."""
+    async with session_factory() as session:
+        statement = (
+            select(Todo.id, Todo.task, Todo.is_completed, Todo.user_id)
+            .where(Todo.user_id == user_id)
+            .order_by(col(Todo.id))
+            .execution_options(yield_per=TODO_EXPORT_BATCH_SIZE)
+        )
+        result = await session.stream(statement)
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            async for rows in result.partitions():
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            async for rows in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows
+                )
+
+
+@app.get("/todos/export")
+async def export_todos(
+    current_user: Annotated[UserPrincipal, Depends(get_current_principal)],
+    session_factory: Annotated[object, Depends(get_session_factory)],
+    fmt: Annotated[Literal["ndjson", "csv"], Query(alias="format")] = "ndjson",
+):
+    # The request's session is closed before a streamed body is sent, so the
+    # generator opens its own.
+    if fmt == "csv":
+        return StreamingResponse(
+            stream_todos(session_factory, current_user.id, fmt),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="todos.csv"'},
+        )
+    return StreamingResponse(
+        stream_todos(session_factory, current_user.id, fmt),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.get("/todos/{id}", response_model=TodoRead)
 async def get_single_todo(
     id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    session: Annotated[Session, Depends(get_session)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_principal)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
     statement = (
-        select(Todo)
+        select(*TODO_COLUMNS)
         .where(Todo.user_id == current_user.id)
         .where(Todo.id == id)
         .order_by(col(Todo.id))
     )
-    todo = session.exec(statement).first()
+    todo = (await session.exec(statement)).first()
     if todo:
-        return todo
+        etag = todo_etag(todo)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return ORJSONResponse(todo_row_json(todo), headers={"ETag": etag, **REVALIDATE})
     else:
         raise HTTPException(status_code=404, detail="No todo found")
 
 
-@app.put("/todos/{id}", response_model=Todo)
+@app.put("/todos/{id}", response_model=TodoRead)
 async def update_todo(
     id: int,
     todo: Todo_Edit,
-    current_user: Annotated[User, Depends(get_current_user)],
-    session: Annotated[Session, Depends(get_session)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_principal)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     statement = select(Todo).where(Todo.user_id == current_user.id).where(Todo.id == id)
 
-    existing_todo = session.exec(statement).first()
+    existing_todo = (await session.exec(statement)).first()
     if existing_todo:
         existing_todo.task = todo.task
         existing_todo.is_completed = todo.is_completed
+        existing_todo.version = Todo.version + 1
         session.add(existing_todo)
-        session.commit()
-        session.refresh(existing_todo)
-        return existing_todo
+        await bump_todos_version(session, current_user.id)
+        await session.commit()
+        await session.refresh(existing_todo)
+        return ORJSONResponse(
+            todo_json(existing_todo), headers={"ETag": todo_etag(existing_todo)}
+        )
     else:
         raise HTTPException(status_code=404, detail="Todo not found")
 
@@ -314,15 +594,16 @@ async def update_todo(
 @app.delete("/todos/{id}")
 async def delete_todo(
     id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    session: Annotated[Session, Depends(get_session)],
+    current_user: Annotated[UserPrincipal, Depends(get_current_principal)],
+    session: Annotated[AsyncSession, Depends(get_session)],
     response: Response,
 ):
     statement = select(Todo).where(Todo.user_id == current_user.id).where(Todo.id == id)
-    existing_todo = session.exec(statement).first()
+    existing_todo = (await session.exec(statement)).first()
     if existing_todo:
-        session.delete(existing_todo)
-        session.commit()
+        await session.delete(existing_todo)
+        await bump_todos_version(session, current_user.id)
+        await session.commit()
         response.status_code = 202
         return {"message": "Task successfully deleted"}
     else:
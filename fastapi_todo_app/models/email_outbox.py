@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Index
+from sqlmodel import Field, SQLModel
+
+from fastapi_todo_app.models.forgot_password import TZDateTime
+
+
+class EmailOutbox(SQLModel, table=True):
+    """An email waiting to be delivered by the outbox dispatcher.
+
+    Rows are written in the same transaction as the token they carry, so an
+    email is queued if and only if its token was committed.
+    """
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+        Index("ix_email_outbox_user_id_kind", "user_id", "kind"),
+        {"extend_existing": True},
+    )
+    id: int | None = Field(default=None, primary_key=True)
+    kind: str = Field(max_length=32)  # verification | forgot_password | two_factor
+    to_email: str = Field(max_length=255)
+    token: str
+    user_id: int | None = Field(default=None, foreign_key="user.id")
+    status: str = Field(default="pending", max_length=16)
+    attempts: int = Field(default=0)
+    last_error: str | None = Field(default=None)
+    created_at: datetime = Field(
+        sa_column=Column(TZDateTime(timezone=True)),
+        default_factory=lambda: datetime.now(timezone.utc),
+    )
+    next_attempt_at: datetime = Field(
+        sa_column=Column(TZDateTime(timezone=True)),
+        default_factory=lambda: datetime.now(timezone.utc),
+    )
+    sent_at: datetime | None = Field(
+        default=None, sa_column=Column(TZDateTime(timezone=True))
+    )
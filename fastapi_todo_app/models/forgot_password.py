@@ -29,14 +29,14 @@ class ForgotPasswordModel(SQLModel, table=True):
     __table_args__ = {"extend_existing": True}
     __tablename__: str = "forgot_password_tokens"
     id: int | None = Field(default=None, primary_key=True)
-    token: str = Field()
-    user_id: int = Field(foreign_key="user.id")
+    token: str = Field(unique=True, index=True)
+    user_id: int = Field(foreign_key="user.id", unique=True, index=True)
     created_at: datetime = Field(
         sa_column=Column(TZDateTime(timezone=True)),
         default_factory=lambda: datetime.now(timezone.utc),
     )
     expires_at: datetime = Field(
-        sa_column=Column(TZDateTime(timezone=True)),
+        sa_column=Column(TZDateTime(timezone=True), index=True),
         default_factory=lambda: datetime.now(timezone.utc) + timedelta(hours=24),
     )
     # user: Optional["User"] = Relationship(back_populates="forgot_password")
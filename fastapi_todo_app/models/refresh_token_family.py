@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Column
+from sqlmodel import Field, SQLModel
+
+from fastapi_todo_app.models.forgot_password import TZDateTime
+
+
+class RefreshTokenFamily(SQLModel, table=True):
+    """The chain of refresh tokens descended from one login.
+
+    Only the newest token of a family (``current_jti``) can be exchanged.
+    Presenting an older one means it was replayed, so the family is revoked.
+    """
+
+    __tablename__ = "refresh_token_families"
+    __table_args__ = {"extend_existing": True}
+    id: str = Field(primary_key=True, max_length=32)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    current_jti: str = Field(max_length=32)
+    created_at: datetime = Field(
+        sa_column=Column(TZDateTime(timezone=True)),
+        default_factory=lambda: datetime.now(timezone.utc),
+    )
+    expires_at: datetime = Field(sa_column=Column(TZDateTime(timezone=True), index=True))
+    revoked_at: datetime | None = Field(
+        default=None, sa_column=Column(TZDateTime(timezone=True), index=True)
+    )
@@ -1,8 +1,14 @@
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
 class Todo(SQLModel, table=True):
+    # Serves every todo lookup (WHERE user_id = ? [AND id ...]) as well as
+    # keyset pagination: WHERE user_id = ? AND id > ? ORDER BY id
+    __table_args__ = (Index("ix_todo_user_id_id", "user_id", "id"),)
     id: int | None = Field(default=None, primary_key=True)  # Simplified
-    task: str = Field(index=True, min_length=3, max_length=100)
+    task: str = Field(min_length=3, max_length=100)
     is_completed: bool = Field(default=False)
     user_id: int = Field(foreign_key="user.id")  # Simplified
+    # Bumped on every change; the todo's ETag
+    version: int = Field(default=1)
@@ -10,8 +10,10 @@ class TwoFactorToken(SQLModel, table=True):
     
     id: Optional[int] = Field(default=None, primary_key=True)
     token: str = Field(index=True)
-    expires: datetime
-    user_id: Optional[int] = Field(default=None, foreign_key="user.id")
+    expires: datetime = Field(index=True)
+    user_id: Optional[int] = Field(
+        default=None, foreign_key="user.id", unique=True, index=True
+    )
 
 
 class TwoFactorConfirmation(SQLModel, table=True):
@@ -19,5 +21,5 @@ class TwoFactorConfirmation(SQLModel, table=True):
     __tablename__ = "two_factor_confirmations"
     
     id: Optional[int] = Field(default=None, primary_key=True)
-    expires: datetime
-    user_id: Optional[int] = Field(default=None, foreign_key="user.id")
\ No newline at end of file
+    expires: datetime = Field(index=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
\ No newline at end of file
@@ -13,13 +13,19 @@ class User(SQLModel, table=True):
     __tablename__ = "user"
     __table_args__ = {"extend_existing": True}
     id: int | None = Field(default=None, primary_key=True)
-    name: str = Field(index=True, min_length=3, max_length=50)
-    username: str = Field(index=True, min_length=3, max_length=50)
-    email: str = Field(index=True, min_length=5, max_length=50)
+    name: str = Field(min_length=3, max_length=50)
+    username: str = Field(unique=True, index=True, min_length=3, max_length=50)
+    email: str = Field(unique=True, index=True, min_length=5, max_length=50)
     password: str = Field(min_length=8)
     is_verified: bool = Field(default=False)
     role: str = Field(default="user")
     is_two_factor_enabled: bool = Field(default=False)
+    # Bumped whenever the password or settings change; tokens carrying an
+    # older value are rejected.
+    token_version: int = Field(default=0)
+    # Bumped whenever any of the user's todos is created, changed or
+    # deleted; the ETag of their todo list.
+    todos_version: int = Field(default=0)
 
     # Relationships
     # two_factor_tokens: List["TwoFactorToken"] = Relationship(back_populates="user")
@@ -13,12 +13,13 @@ class VerificationToken(SQLModel, table=True):
     __table_args__ = {"extend_existing": True}
     __tablename__: str = "email_verification_tokens"
     id: int | None = Field(default=None, primary_key=True)
-    token: str = Field()
-    user_id: int = Field(foreign_key="user.id")
+    token: str = Field(unique=True, index=True)
+    user_id: int = Field(foreign_key="user.id", unique=True, index=True)
     created_at: datetime = Field(default_factory=datetime.now)
     expires_at: datetime = Field(
         default_factory=lambda: datetime.now()
-        + timedelta(minutes=EMAIL_VERIFICATION_TOKEN_EXPIRY_TIME)
+        + timedelta(minutes=EMAIL_VERIFICATION_TOKEN_EXPIRY_TIME),
+        index=True,
     )
     # user: Optional["User"] = Relationship(back_populates="verification_tokens")
 
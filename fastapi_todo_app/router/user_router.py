@@ -3,7 +3,9 @@ from datetime import datetime
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from fastapi_todo_app.db import get_session
 from fastapi_todo_app.models.user_model import User
@@ -19,15 +21,18 @@ from fastapi_todo_app.services.auth import (
     forgot_password_token,
     get_current_user,
     get_user_from_db,
-    hash_password,
+    hash_password_async,
     update_password,
-    verify_password,
+    verify_password_async,
     verify_reset_token,
 )
-from fastapi_todo_app.services.email_service import (
-    send_forgot_password_email,
-    send_verification_email,
+from fastapi_todo_app.services.email_outbox import enqueue_email, outbox_dispatcher
+from fastapi_todo_app.services.principal import (
+    bump_token_version,
+    invalidate_principal,
 )
+from fastapi_todo_app.services.rate_limit import rate_limit
+from fastapi_todo_app.services.token_repository import consume_token, issue_token
 
 user_router = APIRouter(
     prefix="/user", tags=["user"], responses={404: {"description": "Not found"}}
@@ -42,9 +47,9 @@ async def read_user():
 @user_router.post("/register")
 async def regiser_user(
     new_user: Annotated[Register_User, Depends()],
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
-    db_user = get_user_from_db(session, new_user.username, new_user.email)
+    db_user = await get_user_from_db(session, new_user.username, new_user.email)
     if db_user:
         raise HTTPException(
             status_code=409, detail="User with these credentials already exists"
@@ -54,12 +59,19 @@ async def regiser_user(
         name=new_user.name,
         username=new_user.username,
         email=new_user.email,
-        password=hash_password(new_user.password),
+        password=await hash_password_async(new_user.password),
         is_verified=False,
     )
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    try:
+        await session.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent registration for the same username/email
+        await session.rollback()
+        raise HTTPException(
+            status_code=409, detail="User with these credentials already exists"
+        )
+    await session.refresh(user)
 
     if not user.id:
         raise HTTPException(
@@ -70,10 +82,10 @@ async def regiser_user(
     token = secrets.token_urlsafe(32)
     verification_token = VerificationToken(token=token, user_id=user.id)
     session.add(verification_token)
-    session.commit()
-
-    # Send verification email
-    send_verification_email(user.email, token)
+    # Queue the verification email in the same transaction as the token
+    enqueue_email(session, "verification", user.email, token, user.id)
+    await session.commit()
+    outbox_dispatcher.notify()
 
     return {
         "message": f"User {user.username} registered successfully. Please check your email to verify your account."
@@ -81,12 +93,8 @@ async def regiser_user(
 
 
 @user_router.get("/verify/{token}")
-async def verify_email(token: str, session: Annotated[Session, Depends(get_session)]):
-    verification = session.exec(
-        select(VerificationToken).where(
-            VerificationToken.token == token,
-        )
-    ).first()
+async def verify_email(token: str, session: Annotated[AsyncSession, Depends(get_session)]):
+    verification = await consume_token(session, VerificationToken, token)
 
     if not verification:
         raise HTTPException(
@@ -94,18 +102,19 @@ async def verify_email(token: str, session: Annotated[Session, Depends(get_sessi
         )
 
     if verification.expires_at < datetime.now():
-        session.delete(verification)
-        session.commit()
+        await session.commit()
         raise HTTPException(status_code=400, detail="Verification token has expired")
 
-    user = session.exec(select(User).where(User.id == verification.user_id)).first()
+    user = (
+        await session.exec(select(User).where(User.id == verification.user_id))
+    ).first()
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     user.is_verified = True
-    session.delete(verification)
-    session.commit()
+    await session.commit()
+    invalidate_principal(user)
 
     return VerificationResponse(
         success=True, message="Email verified successfully", data={"email": user.email}
@@ -120,15 +129,17 @@ async def user_profile(current_user: Annotated[User, Depends(get_current_user)])
 @user_router.patch("/settings")
 async def update_settings(
     request: UpdateSettingsRequest,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
     current_user: User = Depends(get_current_user),
 ):
     try:
         # Update user settings
         current_user.is_two_factor_enabled = request.is_two_factor_enabled
+        bump_token_version(current_user)
         session.add(current_user)
-        session.commit()
-        session.refresh(current_user)
+        await session.commit()
+        await session.refresh(current_user)
+        invalidate_principal(current_user)
 
         return {"success": True, "message": "Settings updated successfully"}
     except Exception as e:
@@ -138,18 +149,22 @@ async def update_settings(
 @user_router.post("/change-password")
 async def change_password(
     request: ChangePasswordRequest,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
     current_user: User = Depends(get_current_user),
 ):
     try:
         # Verify current password
-        if not verify_password(request.current_password, current_user.password):
+        if not await verify_password_async(
+            request.current_password, current_user.password
+        ):
             raise HTTPException(status_code=400, detail="Current password is incorrect")
 
         # Update password
-        current_user.password = hash_password(request.new_password)
+        current_user.password = await hash_password_async(request.new_password)
+        bump_token_version(current_user)
         session.add(current_user)
-        session.commit()
+        await session.commit()
+        invalidate_principal(current_user)
 
         return {"success": True, "message": "Password changed successfully"}
     except HTTPException as e:
@@ -158,24 +173,29 @@ async def change_password(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@user_router.post("/forgot-password")
+@user_router.post(
+    "/forgot-password",
+    dependencies=[Depends(rate_limit("forgot-password", account_field="email"))],
+)
 async def forgot_password(
     email: str,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
-    user = get_user_from_db(session, email=email)
+    user = await get_user_from_db(session, email=email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Create verification token
-    fg_pw_token = forgot_password_token(user.id, session)
+    fg_pw_token = await forgot_password_token(user.id, session)
     if not fg_pw_token:
         raise HTTPException(
             status_code=500, detail="Failed to generate forgot password token"
         )
 
-    # Send forgot password email
-    send_forgot_password_email(user.email, fg_pw_token.token)
+    # Queue the forgot password email in the same transaction as the token
+    enqueue_email(session, "forgot_password", user.email, fg_pw_token.token, user.id)
+    await session.commit()
+    outbox_dispatcher.notify()
 
     return {"message": "Forgot password email sent successfully"}
 
@@ -183,46 +203,43 @@ async def forgot_password(
 @user_router.post("/reset-password")
 async def reset_password(
     request: ResetPasswordRequest,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     """Reset user's password using the reset token."""
-    user = verify_reset_token(request.token, session)
+    user = await verify_reset_token(request.token, session)
     if not user:
         raise HTTPException(status_code=400, detail="Invalid or expired reset token")
 
-    if not update_password(user, request.new_password, session):
+    if not await update_password(user, request.new_password, session):
         raise HTTPException(status_code=500, detail="Failed to update password")
 
     return {"message": "Password updated successfully"}
 
 
-@user_router.post("/resend-verification-email")
+@user_router.post(
+    "/resend-verification-email",
+    dependencies=[Depends(rate_limit("resend", account_field="user_name"))],
+)
 async def resend_verification_email(
     user_name: str,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
-    current_user = get_user_from_db(session, username=user_name)
+    current_user = await get_user_from_db(session, username=user_name)
 
     if not current_user:
         raise HTTPException(status_code=404, detail="User not found")
 
     if current_user.is_verified:
         raise HTTPException(status_code=400, detail="User is already verified")
-    exisiting_token = session.exec(
-        select(VerificationToken).where(VerificationToken.user_id == current_user.id)
-    ).all()
-
-    for token in exisiting_token:
-        session.delete(token)
-    session.commit()
-    # Create verification token
+    # Create verification token, replacing any earlier one
     token = secrets.token_urlsafe(32)
-    verification_token = VerificationToken(token=token, user_id=current_user.id)
-    session.add(verification_token)
-    session.commit()
-
-    # Send verification email
-    send_verification_email(current_user.email, token)
+    await issue_token(
+        session, VerificationToken(token=token, user_id=current_user.id)
+    )
+    # Queue the verification email in the same transaction as the token
+    enqueue_email(session, "verification", current_user.email, token, current_user.id)
+    await session.commit()
+    outbox_dispatcher.notify()
 
     return {
         "message": "Verification email resent successfully. Please check your email."
@@ -9,3 +9,43 @@ class Todo_Create(BaseModel):
 class Todo_Edit(BaseModel):
     task: str = Field(index=True, min_length=3, max_length=100)
     is_completed: bool = Field(default=False)
+
+
+class TodoRead(BaseModel):
+    """A todo as the API returns it."""
+
+    id: int
+    task: str
+    is_completed: bool
+    user_id: int
+    version: int
+
+
+class TodoPage(BaseModel):
+    items: list[TodoRead]
+    # Pass back as `cursor` to fetch the next page; None on the last page
+    next_cursor: int | None = None
+
+
+class Todo_Patch(BaseModel):
+    id: int
+    task: str | None = Field(default=None, min_length=3, max_length=100)
+    is_completed: bool | None = None
+
+
+class TodoBulkRequest(BaseModel):
+    create: list[Todo_Create] = []
+    update: list[Todo_Patch] = []
+    delete: list[int] = []
+
+
+class TodoBulkItemResult(BaseModel):
+    id: int
+    status: str  # "updated", "deleted" or "not_found"
+    todo: TodoRead | None = None
+
+
+class TodoBulkResponse(BaseModel):
+    created: list[TodoRead]
+    updated: list[TodoBulkItemResult]
+    deleted: list[TodoBulkItemResult]
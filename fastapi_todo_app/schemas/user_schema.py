@@ -20,6 +20,11 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: str
     email: str
+    # Embedded in every token; None only on tokens issued before it was
+    uid: Optional[int] = None
+    # Only present on tokens minted in stateless principal mode
+    role: Optional[str] = None
+    ver: Optional[int] = None
 
 
 class RefreshTokenData(BaseModel):
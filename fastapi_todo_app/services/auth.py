@@ -1,27 +1,63 @@
+import logging
 import random
 import secrets
 from datetime import datetime, timedelta, timezone
-from typing import Annotated
+from typing import Annotated, Iterable, Literal, NamedTuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlmodel import Session, select
+from sqlalchemy import or_
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from fastapi_todo_app.db import get_session
 from fastapi_todo_app.models.forgot_password import ForgotPasswordModel
 from fastapi_todo_app.models.user_model import User
 from fastapi_todo_app.schemas.user_schema import RefreshTokenData, TokenData
+from fastapi_todo_app.services.cache import TTLCache, token_cache_key
+from fastapi_todo_app.services.metrics import (
+    jwt_decode_duration,
+    password_verify_duration,
+    registry,
+)
+from fastapi_todo_app.services.password_pool import password_pool
+from fastapi_todo_app.services.principal import (
+    UserPrincipal,
+    bump_token_version,
+    invalidate_principal,
+    principal_cache,
+    principal_claims,
+    token_versions,
+)
+from fastapi_todo_app.services.token_codec import token_codec
+from fastapi_todo_app.services.token_repository import consume_token, issue_token
 from fastapi_todo_app.settings import (
-    ALGORITHM,
-    EXPIRY_TIME,
-    REFRESH_TOKEN_EXPIRY_TIME,
-    SECRET_KEY,
+    JWT_CLAIMS_CACHE_SIZE,
+    JWT_CLAIMS_CACHE_TTL,
+    STATELESS_PRINCIPAL,
 )
 
+logger = logging.getLogger(__name__)
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth_scheme = OAuth2PasswordBearer(tokenUrl="/token")
+# The "typ" claim keeps access and refresh tokens from standing in for each other
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+claims_cache = TTLCache(maxsize=JWT_CLAIMS_CACHE_SIZE, ttl=JWT_CLAIMS_CACHE_TTL)
+registry.counter(
+    "jwt_claims_cache_hits_total",
+    "Access tokens served from the claims cache",
+    function=lambda: claims_cache.hits,
+)
+registry.counter(
+    "jwt_claims_cache_misses_total",
+    "Access tokens that had to be verified",
+    function=lambda: claims_cache.misses,
+)
 
 
 def create_credentials_exception(detail: str, headers: dict | None = None):
@@ -40,181 +76,327 @@ def verify_password(password, hash_password):
     return pwd_context.verify(password, hash_password)
 
 
-def get_user_from_db(
-    session: Session,
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the password worker pool."""
+    return await password_pool.run(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    """Verify a password on the password worker pool."""
+    with password_verify_duration.time():
+        return await password_pool.run(verify_password, password, hashed_password)
+
+
+class UserMatch(NamedTuple):
+    user: User
+    matched: Literal["username", "email"]
+
+
+async def lookup_user(
+    session: AsyncSession,
     username: str | None = None,
     email: str | None = None,
-):
-    print(f"🔍 Searching for user with username: {username}, email: {email}")
-    statement = select(User).where(User.username == username)
-    user = session.exec(statement).first()
-    print(f"👤 User found by username: {user is not None}")
-    if not user and email:
-        statement = select(User).where(User.email == email)
-        user = session.exec(statement).first()
-        print(f"👤 User found by email: {user is not None}")
-        if user:
-            return user
-    return user
+) -> UserMatch | None:
+    """Find a user by username or email in a single query.
+
+    A username match wins over an email match, as both columns are unique the
+    query returns at most two rows.
+    """
+    conditions = []
+    if username is not None:
+        conditions.append(User.username == username)
+    if email is not None:
+        conditions.append(User.email == email)
+    if not conditions:
+        return None
+    users = (await session.exec(select(User).where(or_(*conditions)))).all()
+    for user in users:
+        if username is not None and user.username == username:
+            return UserMatch(user, "username")
+    return UserMatch(users[0], "email") if users else None
+
+
+async def lookup_users(
+    session: AsyncSession, identifiers: Iterable[str]
+) -> dict[str, UserMatch]:
+    """Resolve many usernames-or-emails in a single query.
+
+    Returns a mapping of each identifier that matched a user; identifiers
+    that match nobody are left out.
+    """
+    identifiers = set(identifiers)
+    if not identifiers:
+        return {}
+    statement = select(User).where(
+        or_(col(User.username).in_(identifiers), col(User.email).in_(identifiers))
+    )
+    matches: dict[str, UserMatch] = {}
+    for user in (await session.exec(statement)).all():
+        if user.email in identifiers:
+            matches.setdefault(user.email, UserMatch(user, "email"))
+        if user.username in identifiers:
+            matches[user.username] = UserMatch(user, "username")
+    return matches
 
 
-def authenticate_user(
-    username, password, session: Annotated[Session, Depends(get_session)]
+async def get_user_from_db(
+    session: AsyncSession,
+    username: str | None = None,
+    email: str | None = None,
+) -> User | None:
+    match = await lookup_user(session, username=username, email=email)
+    return match.user if match else None
+
+
+async def authenticate_user(
+    username, password, session: Annotated[AsyncSession, Depends(get_session)]
 ):
-    print(f"🔐 Attempting to authenticate user: {username}")
-    db_user = get_user_from_db(session, username)
+    logger.debug("Authenticating %s", username)
+    db_user = await get_user_from_db(session, username)
     if not db_user:
         raise ValueError("User not found")
-    if not verify_password(password, db_user.password):
+    if not await verify_password_async(password, db_user.password):
         raise ValueError("Incorrect password")
-    print(f"✅ Authentication successful for user: {username}")
+    logger.debug("Authenticated %s", username)
     return db_user
 
 
-def create_access_token(data: dict, expiry_time: timedelta | None):
+def create_access_token(
+    data: dict, expiry_time: timedelta | None = None, user: User | None = None
+):
     data_to_encode = data.copy()
-    if expiry_time:
-        expire = datetime.now(timezone.utc) + expiry_time
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=int(str(EXPIRY_TIME)))
-    data_to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(data_to_encode, str(SECRET_KEY), algorithm=str(ALGORITHM))
+    if user is not None:
+        data_to_encode["uid"] = user.id
+        if STATELESS_PRINCIPAL:
+            data_to_encode.update(principal_claims(user))
+    expire = datetime.now(timezone.utc) + (expiry_time or token_codec.access_ttl)
+    data_to_encode.update({"exp": expire, "typ": ACCESS_TOKEN_TYPE})
+    encoded_jwt = token_codec.encode(data_to_encode)
     return encoded_jwt
 
 
-def create_refresh_token(data: dict, expiry_time: timedelta | None):
+def create_refresh_token(
+    data: dict, expiry_time: timedelta | None = None, user: User | None = None
+):
     data_to_encode = data.copy()
-    if expiry_time:
-        expire = datetime.now(timezone.utc) + expiry_time
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(
-            days=int(str(REFRESH_TOKEN_EXPIRY_TIME))
-        )
-    data_to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(data_to_encode, str(SECRET_KEY), algorithm=str(ALGORITHM))
+    if user is not None:
+        data_to_encode["uid"] = user.id
+        if STATELESS_PRINCIPAL:
+            data_to_encode.update(principal_claims(user))
+    expire = datetime.now(timezone.utc) + (expiry_time or token_codec.refresh_ttl)
+    data_to_encode.update({"exp": expire, "typ": REFRESH_TOKEN_TYPE})
+    encoded_jwt = token_codec.encode(data_to_encode)
     return encoded_jwt
 
 
-def validate_refresh_token(
+def decode_access_token(token: str) -> dict:
+    """Decode and verify an access token, reusing cached claims when possible."""
+    cache_key = token_cache_key(token)
+    payload = claims_cache.get(cache_key)
+    if payload is not None:
+        return payload
+    with jwt_decode_duration.time():
+        payload = token_codec.decode(token)
+    claims_cache.set(cache_key, payload, expires_at=payload.get("exp"))
+    return payload
+
+
+def invalidate_access_token(token: str) -> bool:
+    """Drop an access token's cached claims so it is verified again on next use."""
+    return claims_cache.invalidate(token_cache_key(token))
+
+
+async def validate_refresh_token(
     token: str,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     try:
-        payload = jwt.decode(token, str(SECRET_KEY), str(ALGORITHM))
+        payload = token_codec.decode(token)
         email: str | None = payload.get("sub")
         username: str | None = payload.get("sub")
         if email is None:
             raise create_credentials_exception("Token payload missing email field")
         token_data = RefreshTokenData(email=email, username=username)
+        token_version = payload.get("ver")
     except JWTError:
         raise create_credentials_exception("Could not validate token")
-    user = get_user_from_db(
+    user = await get_user_from_db(
         session, email=token_data.email, username=token_data.username
     )
     if not user:
         raise create_credentials_exception("Invalid credentials")
+    check_token_version(token_version, user.token_version)
     return user
 
 
-def get_current_user(
-    token: Annotated[str, Depends(oauth_scheme)],
-    session: Annotated[Session, Depends(get_session)],
-):
-    print(token)
+def check_token_version(token_version: int | None, current_version: int | None):
+    """Reject tokens minted before the user's last password or settings change."""
+    if token_version is not None and token_version != current_version:
+        raise create_credentials_exception(
+            "Token has been revoked. Please login again."
+        )
+
+
+async def get_token_version(session: AsyncSession, user_id: int) -> int | None:
+    """Return a user's current token_version, cached for a short while."""
+    version = token_versions.get(user_id)
+    if version is None:
+        statement = select(User.token_version).where(User.id == user_id)
+        version = (await session.exec(statement)).first()
+        if version is not None:
+            token_versions.set(user_id, version)
+    return version
+
 
+def get_token_data(token: str) -> TokenData:
+    """Decode an access token and return the identity it was issued for."""
     try:
-        print("🚀 ~ file: auth.py:124 ~ token:", token, SECRET_KEY, ALGORITHM)
         try:
-            payload = jwt.decode(token, str(SECRET_KEY), algorithms=[str(ALGORITHM)])
-            print("🚀 ~ file: auth.py:124 ~ payload:", payload)
+            payload = decode_access_token(token)
         except jwt.ExpiredSignatureError:
             raise create_credentials_exception(
                 "Token has expired. Please refresh your token or login again."
             )
-        except jwt.InvalidTokenError:
-            raise create_credentials_exception("Invalid token format or signature.")
+        except JWTError:
+            raise create_credentials_exception("Could not validate credentials")
         except Exception as e:
-            print(f"JWT decode error: {str(e)}")
+            logger.warning("JWT decode error: %s", e)
             raise create_credentials_exception(f"Failed to decode token: {str(e)}")
+        if payload.get("typ", ACCESS_TOKEN_TYPE) != ACCESS_TOKEN_TYPE:
+            raise create_credentials_exception("Not an access token")
 
         email: str | None = payload.get("sub")
         username: str | None = payload.get("sub")
-        print(f"Email: {email}")
-        print(f"Username: {username}")
         if username is None and email is None:
             raise create_credentials_exception("Token payload missing required fields")
-        token_data = TokenData(username=username, email=email)
+        token_data = TokenData(
+            username=username,
+            email=email,
+            uid=payload.get("uid"),
+            role=payload.get("role"),
+            ver=payload.get("ver"),
+        )
     except JWTError:
         raise create_credentials_exception("Could not validate token")
+    return token_data
+
 
-    user = get_user_from_db(
+async def get_current_user(
+    token: Annotated[str, Depends(oauth_scheme)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+):
+    token_data = get_token_data(token)
+    user = await get_user_from_db(
         session, email=token_data.email, username=token_data.username
     )
     if not user:
         raise create_credentials_exception("User not found")
+    check_token_version(token_data.ver, user.token_version)
     return user
 
 
-def forgot_password_token(
-    user_id: int, session: Annotated[Session, Depends(get_session)]
+async def load_principal(
+    session: AsyncSession, subject: str, user_id: int | None
+) -> UserPrincipal:
+    """Resolve a token's user to a principal, cached by user id.
+
+    Tokens minted before they carried a ``uid`` claim are looked up by
+    subject and not cached. A principal whose email and username no longer
+    match the subject is not the user the token was issued to.
+    """
+    principal = None
+    if user_id is not None:
+        principal = principal_cache.get(user_id)
+        if principal is None:
+            user = (await session.exec(select(User).where(User.id == user_id))).first()
+            if user is not None:
+                principal = UserPrincipal.from_user(user)
+                principal_cache.set(user_id, principal)
+    else:
+        user = await get_user_from_db(session, email=subject, username=subject)
+        if user is not None:
+            principal = UserPrincipal.from_user(user)
+    if principal is None or subject not in (principal.email, principal.username):
+        raise create_credentials_exception("User not found")
+    return principal
+
+
+async def get_current_principal(
+    token: Annotated[str, Depends(oauth_scheme)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+) -> UserPrincipal:
+    """Resolve the caller to a cached, read-only snapshot of their user row.
+
+    Use this instead of get_current_user for routes that only need to know
+    who the caller is; it does not touch the user table on a cache hit. In
+    stateless principal mode the snapshot is built from the token claims and
+    only the user's token_version is looked up (and cached).
+    """
+    token_data = get_token_data(token)
+    stateless = token_data.uid is not None and token_data.ver is not None
+    if STATELESS_PRINCIPAL and stateless:
+        principal = UserPrincipal.from_claims(token_data)
+        current_version = await get_token_version(session, principal.id)
+        if current_version is None:
+            raise create_credentials_exception("User not found")
+        check_token_version(principal.token_version, current_version)
+        return principal
+
+    principal = await load_principal(session, token_data.username, token_data.uid)
+    check_token_version(token_data.ver, principal.token_version)
+    return principal
+
+
+async def forgot_password_token(
+    user_id: int, session: Annotated[AsyncSession, Depends(get_session)]
 ) -> ForgotPasswordModel:
-    """Generate a forgot password token for a user."""
-    # Delete any existing tokens for this user
-    statement = select(ForgotPasswordModel).where(
-        ForgotPasswordModel.user_id == user_id
-    )
-    existing_tokens = session.exec(statement).all()
-    for token in existing_tokens:
-        session.delete(token)
-    session.commit()
+    """Generate a forgot password token for a user, replacing any earlier one.
 
-    # Create new token
-    token = secrets.token_urlsafe(32)
+    The new token is written but not committed, so the caller can commit it
+    together with the email that delivers it.
+    """
     forgot_password_token = ForgotPasswordModel(
-        token=token,
+        token=secrets.token_urlsafe(32),
         user_id=user_id,
         created_at=datetime.now(timezone.utc),
         expires_at=datetime.now(timezone.utc) + timedelta(hours=24),
     )
-    session.add(forgot_password_token)
-    session.commit()
-    session.refresh(forgot_password_token)
+    await issue_token(session, forgot_password_token)
     return forgot_password_token
 
 
-def verify_reset_token(token: str, session: Session) -> User | None:
-    """Verify the reset token and return the associated user."""
-    statement = select(ForgotPasswordModel).where(ForgotPasswordModel.token == token)
-    reset_token = session.exec(statement).first()
+async def verify_reset_token(token: str, session: AsyncSession) -> User | None:
+    """Consume the reset token and return the associated user."""
+    reset_token = await consume_token(session, ForgotPasswordModel, token)
 
     if not reset_token:
         return None
 
     # Check if token is expired
     if datetime.now(timezone.utc) > reset_token.expires_at:
-        session.delete(reset_token)
-        session.commit()
+        await session.commit()
         return None
 
     statement = select(User).where(User.id == reset_token.user_id)
-    user = session.exec(statement).first()
-
-    if user:
-        session.delete(reset_token)
-        session.commit()
+    user = (await session.exec(statement)).first()
+    await session.commit()
 
     return user
 
 
-def update_password(user: User, new_password: str, session: Session) -> bool:
+async def update_password(
+    user: User, new_password: str, session: AsyncSession
+) -> bool:
     """Update user's password with the new one."""
     try:
-        user.password = hash_password(new_password)
+        user.password = await hash_password_async(new_password)
+        bump_token_version(user)
         session.add(user)
-        session.commit()
+        await session.commit()
+        invalidate_principal(user)
         return True
     except Exception:
-        session.rollback()
+        await session.rollback()
         return False
 
 
@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, update
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from fastapi_todo_app.db import async_session
+from fastapi_todo_app.models.email_outbox import EmailOutbox
+from fastapi_todo_app.services.email_service import (
+    send_forgot_password_email,
+    send_two_factor_email,
+    send_verification_email,
+)
+from fastapi_todo_app.settings import (
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_LEASE,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_POLL_INTERVAL,
+    OUTBOX_RETRY_BACKOFF,
+)
+
+logger = logging.getLogger(__name__)
+
+SENDERS = {
+    "verification": send_verification_email,
+    "forgot_password": send_forgot_password_email,
+    "two_factor": send_two_factor_email,
+}
+
+
+def enqueue_email(
+    session: AsyncSession, kind: str, to_email: str, token: str, user_id: int | None
+) -> EmailOutbox:
+    """Queue an email in the caller's transaction; it is sent once committed.
+
+    Call ``outbox_dispatcher.notify()`` after the commit to have it picked up
+    straight away instead of on the next poll.
+    """
+    if kind not in SENDERS:
+        raise ValueError(f"Unknown email kind: {kind}")
+    message = EmailOutbox(kind=kind, to_email=to_email, token=token, user_id=user_id)
+    session.add(message)
+    return message
+
+
+class OutboxDispatcher:
+    """Background task that drains the email outbox in batches.
+
+    Each pass locks up to ``batch_size`` due rows (``SKIP LOCKED``, so
+    several workers can run a dispatcher side by side), marks every row that
+    is not the newest of its kind for its user as superseded and claims the
+    rest: they become ``sending`` with a lease of ``lease`` seconds, and the
+    claim is committed before anything is sent. The emails then go out
+    concurrently over the SMTP pool and the outcome is recorded in a second
+    transaction. Failed sends are retried with exponential backoff until
+    ``max_attempts`` is reached; rows whose lease expires (the worker died
+    mid-send) are claimed again.
+    """
+
+    def __init__(
+        self,
+        session_factory=async_session,
+        batch_size: int = 50,
+        poll_interval: float = 5,
+        max_attempts: int = 5,
+        retry_backoff: float = 2,
+        lease: float = 60,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.lease = lease
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="email-outbox")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self) -> None:
+        """Wake the dispatcher after committing new outbox rows."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email outbox pass failed")
+                processed = 0
+            if processed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _backoff(self, attempts: int) -> timedelta:
+        return timedelta(seconds=self.retry_backoff * 2 ** (attempts - 1))
+
+    async def drain_once(self) -> int:
+        """Process one batch of due emails and return how many rows it handled."""
+        claimed, superseded = await self._claim()
+        if not claimed and not superseded:
+            return 0
+
+        # Sent with no transaction open; the claim keeps other workers off
+        # these rows until the lease runs out.
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(SENDERS[kind](to_email, token) for _, kind, to_email, token in claimed),
+            return_exceptions=True,
+        )
+        outcomes = dict(zip((row_id for row_id, *_ in claimed), results))
+        failed = await self._record(outcomes)
+
+        logger.info(
+            "Email outbox: %d sent, %d failed, %d superseded in %.1fms",
+            len(claimed) - failed,
+            failed,
+            superseded,
+            (time.perf_counter() - start) * 1000,
+        )
+        return len(claimed) + superseded
+
+    async def _claim(self) -> tuple[list[tuple[int, str, str, str]], int]:
+        """Claim a batch of due rows for sending and commit the claim.
+
+        Due rows are pending ones whose next attempt has come, and rows left
+        ``sending`` by a worker that died before its lease ran out. Returns
+        ``(id, kind, to_email, token)`` of each claimed row and the number
+        of rows marked superseded instead.
+        """
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as session:
+            statement = (
+                select(EmailOutbox)
+                .where(col(EmailOutbox.status).in_(("pending", "sending")))
+                .where(EmailOutbox.next_attempt_at <= now)
+                .order_by(col(EmailOutbox.id))
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            batch = (await session.exec(statement)).all()
+            if not batch:
+                return [], 0
+
+            # Only the newest email of each kind is worth sending to a user:
+            # issuing a new token replaces the previous one.
+            user_ids = {row.user_id for row in batch if row.user_id is not None}
+            newest: dict[tuple[int, str], int] = {}
+            if user_ids:
+                latest = (
+                    select(
+                        EmailOutbox.user_id,
+                        EmailOutbox.kind,
+                        func.max(EmailOutbox.id),
+                    )
+                    .where(col(EmailOutbox.user_id).in_(user_ids))
+                    .group_by(EmailOutbox.user_id, EmailOutbox.kind)
+                )
+                for user_id, kind, max_id in (await session.exec(latest)).all():
+                    newest[(user_id, kind)] = max_id
+            superseded = [
+                row.id
+                for row in batch
+                if row.user_id is not None
+                and newest.get((row.user_id, row.kind), row.id) != row.id
+            ]
+            claimed = [
+                (row.id, row.kind, row.to_email, row.token)
+                for row in batch
+                if row.id not in superseded
+            ]
+            if superseded:
+                await session.exec(
+                    update(EmailOutbox)
+                    .where(col(EmailOutbox.id).in_(superseded))
+                    .values(status="superseded", token="")
+                )
+            if claimed:
+                await session.exec(
+                    update(EmailOutbox)
+                    .where(col(EmailOutbox.id).in_([row[0] for row in claimed]))
+                    .values(
+                        status="sending",
+                        next_attempt_at=now + timedelta(seconds=self.lease),
+                    )
+                )
+            await session.commit()
+        return claimed, len(superseded)
+
+    async def _record(self, outcomes: dict[int, object]) -> int:
+        """Store the result of each send and return how many failed.
+
+        Once a row is sent or has failed for good its token is blanked, so
+        the outbox does not keep usable secrets around until it is swept.
+        """
+        if not outcomes:
+            return 0
+        sent_at = datetime.now(timezone.utc)
+        failed = 0
+        async with self.session_factory() as session:
+            statement = select(EmailOutbox).where(
+                col(EmailOutbox.id).in_(list(outcomes))
+            )
+            rows = (await session.exec(statement)).all()
+            for row in rows:
+                result = outcomes[row.id]
+                row.attempts += 1
+                if result is True:
+                    row.status = "sent"
+                    row.sent_at = sent_at
+                    row.last_error = None
+                    row.token = ""
+                else:
+                    failed += 1
+                    row.last_error = (
+                        str(result) if isinstance(result, Exception) else "send failed"
+                    )
+                    if row.attempts >= self.max_attempts:
+                        row.status = "failed"
+                        row.token = ""
+                    else:
+                        row.status = "pending"
+                        row.next_attempt_at = sent_at + self._backoff(row.attempts)
+                session.add(row)
+            await session.commit()
+        return failed
+
+
+outbox_dispatcher = OutboxDispatcher(
+    batch_size=OUTBOX_BATCH_SIZE,
+    poll_interval=OUTBOX_POLL_INTERVAL,
+    max_attempts=OUTBOX_MAX_ATTEMPTS,
+    retry_backoff=OUTBOX_RETRY_BACKOFF,
+    lease=OUTBOX_LEASE,
+)
@@ -1,24 +1,58 @@
-import smtplib
+import logging
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
-from fastapi_todo_app.services.auth import generate_two_factor_token
+from fastapi_todo_app.services.metrics import smtp_send_duration, smtp_send_failures
+from fastapi_todo_app.services.smtp_pool import SMTPConnectionPool
 from fastapi_todo_app.settings import (
     FRONTEND_URL,
     SMTP_FROM_EMAIL,
     SMTP_HOST,
     SMTP_PASSWORD,
+    SMTP_POOL_MAX_IDLE,
+    SMTP_POOL_SIZE,
     SMTP_PORT,
+    SMTP_STARTTLS,
+    SMTP_TIMEOUT,
     SMTP_USER,
 )
 
+logger = logging.getLogger(__name__)
+
+smtp_pool = SMTPConnectionPool(
+    host=str(SMTP_HOST),
+    port=int(SMTP_PORT),
+    username=str(SMTP_USER),
+    password=str(SMTP_PASSWORD),
+    use_starttls=SMTP_STARTTLS,
+    size=SMTP_POOL_SIZE,
+    max_idle=SMTP_POOL_MAX_IDLE,
+    timeout=SMTP_TIMEOUT,
+)
+
 
-def send_verification_email(to_email: str, token: str):
+def build_message(to_email: str, subject: str, body: str) -> MIMEMultipart:
     msg = MIMEMultipart()
     msg["From"] = str(SMTP_FROM_EMAIL)
     msg["To"] = to_email
-    msg["Subject"] = "Verify your email address"
+    msg["Subject"] = subject
+    msg.attach(MIMEText(body, "plain"))
+    return msg
+
+
+async def send_message(to_email: str, msg: MIMEMultipart) -> bool:
+    """Send a message over a pooled SMTP connection."""
+    try:
+        with smtp_send_duration.time():
+            await smtp_pool.send(str(SMTP_FROM_EMAIL), to_email, msg.as_string())
+        return True
+    except Exception:
+        smtp_send_failures.inc()
+        logger.exception("Failed to send %r", msg["Subject"])
+        return False
 
+
+async def send_verification_email(to_email: str, token: str):
     verification_link = f"{FRONTEND_URL}/auth/new-verification?token={token}"
     body = f"""
     Hello!
@@ -32,26 +66,11 @@ def send_verification_email(to_email: str, token: str):
     If you didn't register for an account, you can safely ignore this email.
     """
 
-    msg.attach(MIMEText(body, "plain"))
-
-    try:
-        server = smtplib.SMTP(str(SMTP_HOST), int(SMTP_PORT))
-        server.starttls()
-        server.login(str(SMTP_USER), str(SMTP_PASSWORD))
-        text = msg.as_string()
-        server.sendmail(str(SMTP_FROM_EMAIL), to_email, text)
-        server.quit()
-        return True
-    except Exception as e:
-        return False
+    msg = build_message(to_email, "Verify your email address", body)
+    return await send_message(to_email, msg)
 
 
-def send_forgot_password_email(to_email: str, token: str):
-    msg = MIMEMultipart()
-    msg["From"] = str(SMTP_FROM_EMAIL)
-    msg["To"] = to_email
-    msg["Subject"] = "Forgot Password"
-
+async def send_forgot_password_email(to_email: str, token: str):
     verification_link = f"{FRONTEND_URL}/auth/new-password?token={token}"
     body = f"""
     Hello!
@@ -65,27 +84,12 @@ def send_forgot_password_email(to_email: str, token: str):
     If you didn't request for a password reset, you can safely ignore this email.
     """
 
-    msg.attach(MIMEText(body, "plain"))
-
-    try:
-        server = smtplib.SMTP(str(SMTP_HOST), int(SMTP_PORT))
-        server.starttls()
-        server.login(str(SMTP_USER), str(SMTP_PASSWORD))
-        text = msg.as_string()
-        server.sendmail(str(SMTP_FROM_EMAIL), to_email, text)
-        server.quit()
-        return True
-    except Exception as e:
-        return False
+    msg = build_message(to_email, "Forgot Password", body)
+    return await send_message(to_email, msg)
 
 
 async def send_two_factor_email(email: str, token: str):
     """Send 2FA token via email"""
-    msg = MIMEMultipart()
-    msg["From"] = str(SMTP_FROM_EMAIL)
-    msg["To"] = email
-    msg["Subject"] = "Your Two-Factor Authentication Token"
-
     body = f"""
     Hello!
     
@@ -96,15 +100,5 @@ async def send_two_factor_email(email: str, token: str):
     If you did not request this token, please ignore this email.
     """
 
-    msg.attach(MIMEText(body, "plain"))
-
-    try:
-        server = smtplib.SMTP(str(SMTP_HOST), int(SMTP_PORT))
-        server.starttls()
-        server.login(str(SMTP_USER), str(SMTP_PASSWORD))
-        text = msg.as_string()
-        server.sendmail(str(SMTP_FROM_EMAIL), email, text)
-        server.quit()
-        return True
-    except Exception as e:
-        return False
+    msg = build_message(email, "Your Two-Factor Authentication Token", body)
+    return await send_message(email, msg)
@@ -0,0 +1,181 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import redis.asyncio
+
+
+class EphemeralStore(ABC):
+    """Key-value store for short-lived strings with a per-key TTL.
+
+    Backends: ``MemoryStore`` (one process) and ``RedisStore`` (shared by
+    every worker).
+    """
+
+    @abstractmethod
+    async def set(
+        self, key: str, value: str, ttl: float, only_if_absent: bool = False
+    ) -> bool:
+        """Store ``value`` for ``ttl`` seconds; return False if ``only_if_absent``
+        was given and the key already holds a live value."""
+        ...
+
+    @abstractmethod
+    async def get(self, key: str) -> str | None:
+        ...
+
+    @abstractmethod
+    async def pop(self, key: str) -> str | None:
+        """Atomically read and delete a key."""
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str, ttl: float) -> int:
+        """Increment an integer counter and (re)set its TTL; return the new value."""
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryStore(EphemeralStore):
+    """In-process backend. Values are only visible to the worker that wrote them."""
+
+    def __init__(self, clock=time.monotonic, sweep_every: int = 1024):
+        self.clock = clock
+        self.sweep_every = sweep_every
+        self._data: dict[str, tuple[str, float]] = {}
+        self._writes = 0
+
+    def _live(self, key: str) -> str | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= self.clock():
+            del self._data[key]
+            return None
+        return entry[0]
+
+    def _sweep(self) -> None:
+        now = self.clock()
+        for key in [key for key, (_, deadline) in self._data.items() if deadline <= now]:
+            del self._data[key]
+
+    async def set(
+        self, key: str, value: str, ttl: float, only_if_absent: bool = False
+    ) -> bool:
+        if only_if_absent and self._live(key) is not None:
+            return False
+        self._data[key] = (value, self.clock() + ttl)
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self._sweep()
+        return True
+
+    async def get(self, key: str) -> str | None:
+        return self._live(key)
+
+    async def pop(self, key: str) -> str | None:
+        value = self._live(key)
+        self._data.pop(key, None)
+        return value
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def incr(self, key: str, ttl: float) -> int:
+        value = int(self._live(key) or 0) + 1
+        await self.set(key, str(value), ttl)
+        return value
+
+    async def close(self) -> None:
+        self._data.clear()
+
+
+class RedisStore(EphemeralStore):
+    """Backend on ``redis.asyncio``, an optional dependency (``pip install redis``).
+
+    Keeps one client per event loop, since redis-py connections cannot be
+    shared between loops; a connection that went stale while idle is
+    reopened once before a command fails.
+    ``url`` is ``redis://[[user]:password@]host[:port][/db]``.
+    """
+
+    def __init__(self, url: str, timeout: float = 5):
+        try:
+            import redis.asyncio as aioredis
+            from redis.asyncio.retry import Retry
+            from redis.backoff import NoBackoff
+            from redis.exceptions import ConnectionError as RedisConnectionError
+        except ImportError:
+            raise RuntimeError("The redis backends need redis-py: pip install redis")
+        self.url = url
+        self.timeout = timeout
+        self._aioredis = aioredis
+        self._retry = Retry(NoBackoff(), 1)
+        self._retry_on = [RedisConnectionError]
+        self._clients: dict[asyncio.AbstractEventLoop, "redis.asyncio.Redis"] = {}
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            for closed in [other for other in self._clients if other.is_closed()]:
+                del self._clients[closed]
+            client = self._clients[loop] = self._aioredis.from_url(
+                self.url,
+                decode_responses=True,
+                protocol=2,
+                socket_timeout=self.timeout,
+                socket_connect_timeout=self.timeout,
+                retry=self._retry,
+                retry_on_error=self._retry_on,
+            )
+        return client
+
+    async def set(
+        self, key: str, value: str, ttl: float, only_if_absent: bool = False
+    ) -> bool:
+        stored = await self._client().set(
+            key, value, px=max(int(ttl * 1000), 1), nx=only_if_absent
+        )
+        return bool(stored)
+
+    async def get(self, key: str) -> str | None:
+        return await self._client().get(key)
+
+    async def pop(self, key: str) -> str | None:
+        return await self._client().getdel(key)
+
+    async def delete(self, key: str) -> None:
+        await self._client().delete(key)
+
+    async def incr(self, key: str, ttl: float) -> int:
+        # One round trip; INCR and PEXPIRE need not be atomic together
+        async with self._client().pipeline(transaction=False) as pipe:
+            pipe.incr(key)
+            pipe.pexpire(key, max(int(ttl * 1000), 1))
+            value, _ = await pipe.execute()
+        return value
+
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        clients, self._clients = self._clients, {}
+        for client_loop, client in clients.items():
+            # A client can only be closed from the loop that opened it
+            if client_loop is loop:
+                await client.aclose()
+
+
+def create_store(backend: str, redis_url: str) -> EphemeralStore:
+    if backend == "memory":
+        return MemoryStore()
+    if backend == "redis":
+        return RedisStore(redis_url)
+    raise ValueError(f"Unknown ephemeral store backend: {backend}")
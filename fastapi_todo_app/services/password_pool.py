@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from fastapi import HTTPException, status
+
+from fastapi_todo_app.settings import (
+    PASSWORD_HASH_EXECUTOR,
+    PASSWORD_HASH_MAX_PENDING,
+    PASSWORD_HASH_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PasswordWorkerPool:
+    """Runs CPU-bound password work (bcrypt) off the event loop.
+
+    The pool is either a thread pool (bcrypt releases the GIL while hashing)
+    or a process pool. The number of calls waiting for or running on a worker
+    is capped at ``max_pending``; beyond that callers get a 503 straight
+    away instead of queueing behind a login burst.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        max_workers: int = 0,
+        max_pending: int = 64,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._executor: Executor | None = None
+        self._pending = 0
+        self.calls = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-worker",
+                )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        self._pending += 1
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._pending -= 1
+            self._record(fn.__name__, time.perf_counter() - start)
+
+    def _record(self, name: str, elapsed: float) -> None:
+        self.calls += 1
+        self.total_seconds += elapsed
+        self.max_seconds = max(self.max_seconds, elapsed)
+        logger.debug("%s took %.1fms", name, elapsed * 1000)
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "avg_ms": (self.total_seconds / self.calls * 1000) if self.calls else 0.0,
+            "max_ms": self.max_seconds * 1000,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordWorkerPool(
+    kind=PASSWORD_HASH_EXECUTOR,
+    max_workers=PASSWORD_HASH_WORKERS,
+    max_pending=PASSWORD_HASH_MAX_PENDING,
+)
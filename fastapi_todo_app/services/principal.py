@@ -0,0 +1,116 @@
+from fastapi_todo_app.models.user_model import User
+from fastapi_todo_app.schemas.user_schema import TokenData
+from fastapi_todo_app.services.cache import TTLCache
+from fastapi_todo_app.settings import (
+    PRINCIPAL_CACHE_SIZE,
+    PRINCIPAL_CACHE_TTL,
+    TODOS_VERSION_CACHE_TTL,
+    TOKEN_VERSION_CACHE_TTL,
+)
+
+
+class UserPrincipal:
+    """Compact, read-only snapshot of the authenticated user.
+
+    Carries only what authorization needs, never the password hash, and is
+    safe to share between requests through the principal cache.
+    """
+
+    __slots__ = (
+        "id",
+        "username",
+        "email",
+        "role",
+        "is_verified",
+        "is_two_factor_enabled",
+        "token_version",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        username: str,
+        email: str,
+        role: str,
+        is_verified: bool,
+        is_two_factor_enabled: bool | None,
+        token_version: int,
+    ):
+        object.__setattr__(self, "id", id)
+        object.__setattr__(self, "username", username)
+        object.__setattr__(self, "email", email)
+        object.__setattr__(self, "role", role)
+        object.__setattr__(self, "is_verified", is_verified)
+        object.__setattr__(self, "is_two_factor_enabled", is_two_factor_enabled)
+        object.__setattr__(self, "token_version", token_version)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self) -> str:
+        return f"UserPrincipal(id={self.id!r}, username={self.username!r})"
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserPrincipal":
+        if user.id is None:
+            raise ValueError("Cannot build a principal for an unsaved user")
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            role=user.role,
+            is_verified=user.is_verified,
+            is_two_factor_enabled=user.is_two_factor_enabled,
+            token_version=user.token_version,
+        )
+
+    @classmethod
+    def from_claims(cls, token_data: TokenData) -> "UserPrincipal":
+        """Build a principal from a stateless access token alone.
+
+        Tokens are only issued to verified users; whether 2FA is enabled is
+        not carried in the token and is left unknown.
+        """
+        if token_data.uid is None or token_data.ver is None:
+            raise ValueError("Token does not carry principal claims")
+        return cls(
+            id=token_data.uid,
+            username=token_data.username,
+            email=token_data.email,
+            role=token_data.role or "user",
+            is_verified=True,
+            is_two_factor_enabled=None,
+            token_version=token_data.ver,
+        )
+
+
+def principal_claims(user: User) -> dict:
+    """Claims embedded in tokens minted in stateless principal mode."""
+    return {"uid": user.id, "role": user.role, "ver": user.token_version}
+
+
+# Keyed by user id (the "uid" claim), never by name: a user deleted and
+# recreated under the same username gets a new id and a fresh snapshot.
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+# Current token_version per user id, so stateless tokens can be checked
+# without loading the user row.
+token_versions = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=TOKEN_VERSION_CACHE_TTL)
+# Current todos_version per user id, behind the ETag of GET /todos/. This
+# worker drops an entry when it bumps the version; other workers pick the
+# change up within the TTL.
+todos_versions = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=TODOS_VERSION_CACHE_TTL)
+
+
+def bump_token_version(user: User) -> None:
+    """Invalidate every token issued to the user so far; commit afterwards."""
+    user.token_version = (user.token_version or 0) + 1
+
+
+def invalidate_principal(user: User) -> None:
+    """Forget the cached snapshot of a user after their row has changed."""
+    if user.id is not None:
+        principal_cache.invalidate(user.id)
+        token_versions.set(user.id, user.token_version)
@@ -0,0 +1,105 @@
+import math
+import time
+from typing import NamedTuple
+
+from fastapi import HTTPException, Request, status
+
+from fastapi_todo_app.services.ephemeral_store import EphemeralStore, create_store
+from fastapi_todo_app.settings import (
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_PER_ACCOUNT,
+    RATE_LIMIT_PER_IP,
+    REDIS_URL,
+)
+
+
+class Rate(NamedTuple):
+    limit: int
+    window: float  # seconds
+
+    @classmethod
+    def parse(cls, value: str) -> "Rate":
+        """Parse ``"<requests>/<seconds>"``, e.g. ``"5/60"``."""
+        limit, _, window = value.partition("/")
+        return cls(int(limit), float(window))
+
+
+class SlidingWindowLimiter:
+    """Sliding-window request counter on top of an ``EphemeralStore``.
+
+    Each key counts hits in fixed windows; the estimate for the sliding window
+    ending now is the current window's count plus the previous window's
+    count weighted by how much of it still overlaps. Costs one increment and
+    one read per check, so the counters can live in Redis and be shared by
+    every worker.
+    """
+
+    def __init__(self, store: EphemeralStore, clock=time.time, enabled: bool = True):
+        self.store = store
+        self.clock = clock
+        self.enabled = enabled
+
+    async def hit(self, key: str, rate: Rate) -> float | None:
+        """Count a request; return seconds to wait if it is over the limit."""
+        now = self.clock()
+        window = int(now // rate.window)
+        elapsed = now - window * rate.window
+        current = await self.store.incr(f"rl:{key}:{window}", ttl=2 * rate.window)
+        previous = int(await self.store.get(f"rl:{key}:{window - 1}") or 0)
+        weight = 1 - elapsed / rate.window
+        if previous * weight + current <= rate.limit:
+            return None
+        if current >= rate.limit or not previous:
+            return rate.window - elapsed
+        # Wait until enough of the previous window has slid out
+        free_at = rate.window * (1 - (rate.limit - current) / previous)
+        return max(free_at - elapsed, 0)
+
+    async def check(self, keys: list[tuple[str, Rate]]) -> None:
+        """Count a request against every key and raise 429 if any is exhausted."""
+        if not self.enabled:
+            return
+        retry_after = None
+        for key, rate in keys:
+            wait = await self.hit(key, rate)
+            if wait is not None:
+                retry_after = max(retry_after or 0, wait)
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please try again later",
+                headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+            )
+
+
+rate_limiter = SlidingWindowLimiter(
+    create_store(RATE_LIMIT_BACKEND, REDIS_URL), enabled=RATE_LIMIT_ENABLED
+)
+per_ip = Rate.parse(RATE_LIMIT_PER_IP)
+per_account = Rate.parse(RATE_LIMIT_PER_ACCOUNT)
+
+
+def rate_limit(scope: str, account_field: str | None = None):
+    """Dependency limiting a route per client IP and, optionally, per account.
+
+    ``account_field`` names the query parameter or form field holding the
+    username or email. Declared in the route's ``dependencies`` it runs
+    before the handler, so a limited request never reaches bcrypt, SMTP or
+    the user table.
+    """
+
+    async def dependency(request: Request) -> None:
+        client = request.client.host if request.client else "unknown"
+        keys = [(f"{scope}:ip:{client}", per_ip)]
+        if account_field is not None:
+            account = request.query_params.get(account_field)
+            if account is None and request.headers.get("content-type", "").startswith(
+                ("application/x-www-form-urlencoded", "multipart/form-data")
+            ):
+                account = (await request.form()).get(account_field)
+            if account:
+                keys.append((f"{scope}:account:{str(account).lower()}", per_account))
+        await rate_limiter.check(keys)
+
+    return dependency
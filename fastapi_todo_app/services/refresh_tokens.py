@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from jose import JWTError
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from fastapi_todo_app.db import async_session
+from fastapi_todo_app.models.refresh_token_family import RefreshTokenFamily
+from fastapi_todo_app.models.user_model import User
+from fastapi_todo_app.services.auth import (
+    REFRESH_TOKEN_TYPE,
+    check_token_version,
+    create_credentials_exception,
+    create_refresh_token,
+    load_principal,
+    validate_refresh_token,
+)
+from fastapi_todo_app.services.cache import token_cache_key
+from fastapi_todo_app.services.principal import UserPrincipal
+from fastapi_todo_app.services.token_codec import token_codec
+from fastapi_todo_app.settings import REFRESH_REVOCATION_SYNC_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+def new_token_id() -> str:
+    return uuid.uuid4().hex
+
+
+class RevocationList:
+    """In-memory set of revoked refresh token families.
+
+    Lets a worker turn away a revoked family with one set lookup instead of
+    a query. Revocations made by this worker are added straight away; the
+    ones made by other workers are picked up by a periodic sync from
+    ``refresh_token_families``. Entries are dropped once the family has
+    expired, since its tokens are rejected on ``exp`` anyway.
+
+    The set is only a fast path: rotation itself is a conditional UPDATE, so
+    a family revoked by another worker since the last sync still cannot be
+    rotated.
+    """
+
+    def __init__(self, session_factory=async_session, sync_interval: float = 5):
+        self.session_factory = session_factory
+        self.sync_interval = sync_interval
+        self._revoked: dict[str, datetime] = {}
+        self._synced_at: datetime | None = None
+        self._task: asyncio.Task | None = None
+
+    def __contains__(self, family_id: str) -> bool:
+        return family_id in self._revoked
+
+    def add(self, family_id: str, expires_at: datetime) -> None:
+        self._revoked[family_id] = expires_at
+
+    async def sync(self) -> int:
+        """Load families revoked since the previous sync; return how many."""
+        now = datetime.now(timezone.utc)
+        statement = (
+            select(RefreshTokenFamily.id, RefreshTokenFamily.expires_at)
+            .where(col(RefreshTokenFamily.revoked_at).is_not(None))
+            .where(RefreshTokenFamily.expires_at > now)
+        )
+        if self._synced_at is not None:
+            # Overlap the previous sync to tolerate clock skew between workers
+            since = self._synced_at - timedelta(seconds=max(self.sync_interval, 1) * 2)
+            statement = statement.where(RefreshTokenFamily.revoked_at >= since)
+        async with self.session_factory() as session:
+            rows = (await session.exec(statement)).all()
+        for family_id, expires_at in rows:
+            self._revoked[family_id] = expires_at
+        for family_id in [f for f, expires in self._revoked.items() if expires <= now]:
+            del self._revoked[family_id]
+        self._synced_at = now
+        return len(rows)
+
+    def start(self) -> None:
+        if self._task is None and self.sync_interval > 0:
+            self._task = asyncio.create_task(self._run(), name="refresh-revocations")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Refresh token revocation sync failed")
+            await asyncio.sleep(self.sync_interval)
+
+
+revocation_list = RevocationList(sync_interval=REFRESH_REVOCATION_SYNC_INTERVAL)
+
+
+def _encode(subject: str, user, family_id: str, jti: str) -> str:
+    # ver is always embedded so a password change also retires refresh tokens
+    return create_refresh_token(
+        {"sub": subject, "fam": family_id, "jti": jti, "ver": user.token_version},
+        user=user,
+    )
+
+
+def start_refresh_family(session: AsyncSession, user: User) -> str:
+    """Begin a new rotation family for a login and return its first token.
+
+    The family row is added to ``session``; the caller commits it.
+    """
+    family = RefreshTokenFamily(
+        id=new_token_id(),
+        user_id=user.id,
+        current_jti=new_token_id(),
+        expires_at=datetime.now(timezone.utc) + token_codec.refresh_ttl,
+    )
+    session.add(family)
+    return _encode(user.email, user, family.id, family.current_jti)
+
+
+def _revoked_exception():
+    return create_credentials_exception(
+        "Refresh token has been revoked. Please login again."
+    )
+
+
+async def _redeem_legacy_token(
+    session: AsyncSession, token: str, payload: dict
+) -> tuple[User, str]:
+    """Exchange a refresh token issued before rotation for a family, once.
+
+    Such tokens carry no ``typ``, so one is only taken for a refresh token
+    if it outlives any access token. Its digest is then stored as an
+    already revoked family, whose primary key makes a second exchange fail
+    on every worker.
+    """
+    now = datetime.now(timezone.utc)
+    exp = payload.get("exp")
+    if exp is None:
+        raise create_credentials_exception("Not a refresh token")
+    expires_at = datetime.fromtimestamp(exp, timezone.utc)
+    if expires_at <= now + token_codec.access_ttl:
+        raise create_credentials_exception("Not a refresh token")
+
+    marker_id = token_cache_key(token)[:32]
+    if marker_id in revocation_list:
+        raise _revoked_exception()
+    user = await validate_refresh_token(token, session)
+    session.add(
+        RefreshTokenFamily(
+            id=marker_id,
+            user_id=user.id,
+            current_jti=marker_id,
+            expires_at=expires_at,
+            revoked_at=now,
+        )
+    )
+    try:
+        await session.flush()
+    except IntegrityError:
+        await session.rollback()
+        revocation_list.add(marker_id, expires_at)
+        raise _revoked_exception()
+    new_token = start_refresh_family(session, user)
+    await session.commit()
+    revocation_list.add(marker_id, expires_at)
+    return user, new_token
+
+
+async def rotate_refresh_token(
+    session: AsyncSession, token: str
+) -> tuple[User | UserPrincipal, str]:
+    """Exchange a refresh token for its successor.
+
+    Returns the user the token belongs to and the new refresh token. The
+    old token stops working. Presenting a token that was already exchanged
+    revokes its whole family, so a stolen token is only good until either
+    party uses it.
+    """
+    try:
+        payload = token_codec.decode(token)
+    except JWTError:
+        raise create_credentials_exception("Could not validate token")
+    subject: str | None = payload.get("sub")
+    family_id: str | None = payload.get("fam")
+    jti: str | None = payload.get("jti")
+    token_type: str | None = payload.get("typ")
+    if subject is None:
+        raise create_credentials_exception("Token payload missing email field")
+    if token_type is not None and token_type != REFRESH_TOKEN_TYPE:
+        raise create_credentials_exception("Not a refresh token")
+
+    if family_id is None or jti is None:
+        if token_type is not None:
+            raise create_credentials_exception("Could not validate token")
+        # Issued before rotation: good for one exchange onto a new family
+        return await _redeem_legacy_token(session, token, payload)
+
+    if family_id in revocation_list:
+        raise _revoked_exception()
+
+    principal = await load_principal(session, subject, payload.get("uid"))
+    check_token_version(payload.get("ver"), principal.token_version)
+
+    now = datetime.now(timezone.utc)
+    new_jti = new_token_id()
+    rotated = (
+        await session.exec(
+            update(RefreshTokenFamily)
+            .where(col(RefreshTokenFamily.id) == family_id)
+            .where(col(RefreshTokenFamily.current_jti) == jti)
+            .where(col(RefreshTokenFamily.revoked_at).is_(None))
+            .values(current_jti=new_jti, expires_at=now + token_codec.refresh_ttl)
+            .returning(RefreshTokenFamily.user_id)
+        )
+    ).first()
+    if rotated is None:
+        # Replayed, or lost a race with another exchange of the same token
+        await session.exec(
+            update(RefreshTokenFamily)
+            .where(col(RefreshTokenFamily.id) == family_id)
+            .where(col(RefreshTokenFamily.revoked_at).is_(None))
+            .values(revoked_at=now)
+        )
+        await session.commit()
+        revocation_list.add(
+            family_id, datetime.fromtimestamp(payload["exp"], timezone.utc)
+        )
+        logger.warning("Refresh token reuse detected, revoked family %s", family_id)
+        raise _revoked_exception()
+    await session.commit()
+    return principal, _encode(subject, principal, family_id, new_jti)
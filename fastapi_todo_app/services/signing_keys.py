@@ -0,0 +1,102 @@
+import base64
+import hashlib
+import json
+from pathlib import Path
+from typing import Iterable
+
+from jose import jwk
+
+from fastapi_todo_app.settings import (
+    ALGORITHM,
+    JWT_PRIVATE_KEY_FILE,
+    JWT_RETIRED_PUBLIC_KEY_FILES,
+    SECRET_KEY,
+)
+
+# Algorithm families whose public half can be published
+ASYMMETRIC_PREFIXES = ("RS", "ES")
+# Members of a JWK that feed its RFC 7638 thumbprint, per key type
+THUMBPRINT_MEMBERS = {"RSA": ("e", "kty", "n"), "EC": ("crv", "kty", "x", "y")}
+
+
+def is_asymmetric(algorithm: str) -> bool:
+    return algorithm.upper().startswith(ASYMMETRIC_PREFIXES)
+
+
+def key_thumbprint(public_jwk: dict) -> str:
+    """RFC 7638 thumbprint of a public JWK, used as its ``kid``."""
+    members = THUMBPRINT_MEMBERS[public_jwk["kty"]]
+    canonical = json.dumps(
+        {name: public_jwk[name] for name in members},
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+    digest = hashlib.sha256(canonical.encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+class KeyRing:
+    """Key material used to sign and verify JWTs.
+
+    With an HMAC algorithm this is just the shared secret. With an RSA or EC
+    algorithm tokens are signed with the private key and carry its ``kid``;
+    the public halves of the current key and of retired keys are published
+    as a JWK Set, so other services can verify tokens without calling us.
+    Retired keys keep verifying tokens signed before a rotation until they
+    are removed from the ring.
+
+    The ring only holds PEMs and secrets; ``TokenCodec`` turns them into
+    whatever key objects its backend signs with.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        secret: str | None = None,
+        private_key_pem: str | None = None,
+        retired_public_key_pems: Iterable[str] = (),
+    ):
+        self.algorithm = algorithm
+        self.asymmetric = is_asymmetric(algorithm)
+        # kid -> PEM (or secret) that verifies tokens carrying that kid
+        self.verify_material: dict[str | None, str] = {}
+        public_jwks = []
+
+        if self.asymmetric:
+            if not private_key_pem:
+                raise ValueError(f"{algorithm} needs a private key (JWT_PRIVATE_KEY_FILE)")
+            self.signing_material = private_key_pem
+            for pem in [private_key_pem, *retired_public_key_pems]:
+                public_key = jwk.construct(pem, algorithm).public_key()
+                public_jwk = public_key.to_dict()
+                kid = key_thumbprint(public_jwk)
+                if kid in self.verify_material:
+                    continue
+                self.verify_material[kid] = public_key.to_pem().decode()
+                public_jwks.append({**public_jwk, "kid": kid, "use": "sig"})
+            self.kid: str | None = public_jwks[0]["kid"]
+        else:
+            if not secret:
+                raise ValueError(f"{algorithm} needs SECRET_KEY")
+            self.signing_material = secret
+            self.verify_material[None] = secret
+            self.kid = None
+
+        self.jwks_json = json.dumps({"keys": public_jwks}, separators=(",", ":"))
+        self.jwks_etag = '"%s"' % hashlib.sha256(self.jwks_json.encode()).hexdigest()[:32]
+
+
+def _read(path: str) -> str:
+    return Path(path).read_text()
+
+
+def load_key_ring() -> KeyRing:
+    return KeyRing(
+        str(ALGORITHM),
+        secret=str(SECRET_KEY),
+        private_key_pem=_read(JWT_PRIVATE_KEY_FILE) if JWT_PRIVATE_KEY_FILE else None,
+        retired_public_key_pems=[_read(path) for path in JWT_RETIRED_PUBLIC_KEY_FILES],
+    )
+
+
+key_ring = load_key_ring()
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import smtplib
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPConnectionPool:
+    """A small pool of authenticated, kept-alive SMTP connections.
+
+    Connecting, STARTTLS and AUTH happen once per connection instead of once
+    per message. A connection that has been idle for longer than
+    ``health_check_interval`` is probed with NOOP before reuse, one idle for
+    longer than ``max_idle`` is closed, and a send that fails because the
+    server dropped the connection is retried once on a fresh connection.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str | None = None,
+        password: str | None = None,
+        use_starttls: bool = True,
+        size: int = 2,
+        max_idle: float = 60,
+        health_check_interval: float = 10,
+        timeout: float = 10,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_starttls = use_starttls
+        self.size = size
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+        self.timeout = timeout
+        self._idle: deque[tuple[smtplib.SMTP, float]] = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self.connections_opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password or "")
+        except Exception:
+            self._close(server)
+            raise
+        self.connections_opened += 1
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @staticmethod
+    def _is_alive(server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _acquire(self) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, last_used = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.max_idle:
+                self._close(server)
+            elif idle_for > self.health_check_interval and not self._is_alive(server):
+                server.close()
+            else:
+                return server
+        return self._connect()
+
+    def _release(self, server: smtplib.SMTP) -> None:
+        with self._lock:
+            self._idle.append((server, time.monotonic()))
+
+    def _resend(self, server: smtplib.SMTP, from_addr, to_addrs, message):
+        logger.info("SMTP connection dropped, reconnecting")
+        server.close()
+        server = self._connect()
+        try:
+            server.sendmail(from_addr, to_addrs, message)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def send_sync(self, from_addr: str, to_addrs: str | list[str], message: str):
+        """Send one message, blocking until the server has accepted it."""
+        with self._slots:
+            server = self._acquire()
+            try:
+                server.sendmail(from_addr, to_addrs, message)
+            except smtplib.SMTPServerDisconnected:
+                server = self._resend(server, from_addr, to_addrs, message)
+            except smtplib.SMTPException:
+                # The server rejected this message; the connection itself is
+                # fine once the transaction is reset.
+                try:
+                    server.rset()
+                except Exception:
+                    server.close()
+                    raise
+                self._release(server)
+                raise
+            except OSError:
+                server = self._resend(server, from_addr, to_addrs, message)
+            except BaseException:
+                # Anything else (a message that cannot be encoded, a
+                # cancelled thread) leaves the connection mid-transaction,
+                # so it is not returned to the pool.
+                server.close()
+                raise
+            self._release(server)
+
+    async def send(self, from_addr: str, to_addrs: str | list[str], message: str):
+        await asyncio.to_thread(self.send_sync, from_addr, to_addrs, message)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for server, _ in idle:
+            self._close(server)
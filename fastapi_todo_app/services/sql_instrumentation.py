@@ -0,0 +1,156 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from fastapi_todo_app.services.metrics import db_statement_duration
+from fastapi_todo_app.settings import (
+    SERVER_TIMING,
+    SQL_N_PLUS_ONE_THRESHOLD,
+    SQL_SLOW_QUERY_MS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    """Statements run and database time spent on behalf of one request."""
+
+    __slots__ = ("label", "scope", "statements", "seconds", "counts")
+
+    def __init__(self, label: str, scope: dict | None = None):
+        self.label = label
+        self.scope = scope
+        self.statements = 0
+        self.seconds = 0.0
+        # statement text -> executions, for spotting N+1 loops
+        self.counts: Counter[str] = Counter()
+
+    @property
+    def route(self) -> str:
+        # FastAPI records the matched route in the scope once routing is done
+        route = self.scope.get("route") if self.scope else None
+        return getattr(route, "path", self.label)
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.statements} queries"'
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("sql_request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+class QueryMonitor:
+    """SQLAlchemy cursor hooks that time every statement.
+
+    Installed on the ``Engine`` class, so it sees every engine, including the
+    sync engine behind each ``AsyncEngine``; SQLAlchemy carries the calling
+    task's context into its greenlets, so the hooks find the request's
+    ``RequestStats`` through a contextvar. Statements slower than
+    ``slow_query_ms`` are logged with their route, and a request that runs
+    the same statement ``n_plus_one_threshold`` times or more is reported
+    as a likely N+1 loop.
+    """
+
+    def __init__(self, slow_query_ms: float = 200, n_plus_one_threshold: int = 10):
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._installed = False
+
+    def install(self) -> None:
+        if not self._installed:
+            event.listen(Engine, "before_cursor_execute", self._before)
+            event.listen(Engine, "after_cursor_execute", self._after)
+            self._installed = True
+
+    @staticmethod
+    def _timer(conn, context) -> dict:
+        # The start time lives on the execution context, which is dropped
+        # with the statement, so one that raises (and never reaches _after)
+        # leaves nothing behind on the pooled connection. Cursor calls made
+        # without a context fall back to a single slot on the connection.
+        return context.__dict__ if context is not None else conn.info
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self._timer(conn, context)["query_start"] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - self._timer(conn, context).pop("query_start")
+        db_statement_duration.observe(elapsed)
+        stats = _current.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.seconds += elapsed
+            if not executemany:  # batches of a bulk statement are not a loop
+                stats.counts[statement] += 1
+        if elapsed * 1000 >= self.slow_query_ms:
+            logger.warning(
+                "Slow query (%.1f ms) in %s: %s",
+                elapsed * 1000,
+                stats.route if stats is not None else "background task",
+                statement,
+            )
+
+    @contextmanager
+    def track(self, label: str, scope: dict | None = None) -> Iterator[RequestStats]:
+        """Attribute the statements run inside the block to one request."""
+        stats = RequestStats(label, scope)
+        token = _current.set(stats)
+        try:
+            yield stats
+        finally:
+            _current.reset(token)
+            self.report_repeats(stats)
+
+    def report_repeats(self, stats: RequestStats) -> None:
+        for statement, count in stats.counts.items():
+            if count >= self.n_plus_one_threshold:
+                logger.warning(
+                    "Possible N+1 in %s: statement ran %d times: %s",
+                    stats.route,
+                    count,
+                    statement,
+                )
+
+
+query_monitor = QueryMonitor(SQL_SLOW_QUERY_MS, SQL_N_PLUS_ONE_THRESHOLD)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware that tracks each HTTP request's SQL.
+
+    It adds a ``Server-Timing: db;dur=<ms>;desc="<n> queries"`` header.
+    Statements run after the headers are sent, such as in a streamed body,
+    are still counted for the N+1 check.
+    """
+
+    def __init__(
+        self, app, monitor: QueryMonitor = query_monitor, enabled: bool = SERVER_TIMING
+    ):
+        self.app = app
+        self.monitor = monitor
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with self.monitor.track(scope["path"], scope) as stats:
+
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start" and self.enabled:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", stats.server_timing().encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
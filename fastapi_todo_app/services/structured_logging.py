@@ -0,0 +1,215 @@
+import json
+import logging
+import queue
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterable
+
+from fastapi_todo_app.services.metrics import registry
+from fastapi_todo_app.settings import (
+    LOG_FORMAT,
+    LOG_LEVEL,
+    LOG_LEVELS,
+    LOG_QUEUE_SIZE,
+    SECRET_KEY,
+    SMTP_PASSWORD,
+)
+
+REDACTED = "[REDACTED]"
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_SENSITIVE_KEY = re.compile(r"pass(word)?|secret|token|authorization|otp", re.I)
+_SENSITIVE_TEXT = (
+    # JWTs, signed or not
+    (re.compile(r"eyJ[\w-]+\.eyJ[\w-]+\.[\w-]*"), REDACTED),
+    # password=..., "token": "...", Authorization: Bearer ...
+    (
+        re.compile(
+            r"""(?i)\b(password|secret|token|authorization)(["']?\s*[:=]\s*["']?)"""
+            r"""(bearer\s+)?[^\s"',}]+"""
+        ),
+        r"\1\2" + REDACTED,
+    ),
+    # Email verification links carry the token in the path
+    (re.compile(r"(/verify/)[\w-]+"), r"\1" + REDACTED),
+    # Credentials in a connection URL
+    (re.compile(r"(://[^:/@\s]+:)[^@\s]+@"), r"\1" + REDACTED + "@"),
+)
+
+
+class Redactor:
+    """Scrubs tokens, passwords and configured secrets out of log output."""
+
+    def __init__(self, secrets: Iterable[str] = ()):
+        # Short values would match all over the place, and are not secret anyway
+        self.secrets = [s for s in secrets if len(s) >= 6]
+
+    def text(self, value: str) -> str:
+        for secret in self.secrets:
+            value = value.replace(secret, REDACTED)
+        for pattern, replacement in _SENSITIVE_TEXT:
+            value = pattern.sub(replacement, value)
+        return value
+
+    def field(self, key: str, value):
+        if _SENSITIVE_KEY.search(key):
+            return REDACTED
+        if isinstance(value, str):
+            return self.text(value)
+        return value
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, or as plain text.
+
+    Fields passed with ``extra=`` are included, and everything goes through
+    the ``Redactor`` first. This runs on the listener thread, so neither the
+    message nor the redaction is paid for by the code that logged.
+    """
+
+    def __init__(self, json_lines: bool = False, redactor: Redactor | None = None):
+        super().__init__()
+        self.json_lines = json_lines
+        self.redactor = redactor or Redactor()
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = self.redactor.text(record.getMessage())
+        extra = {
+            key: self.redactor.field(key, value)
+            for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS and not key.startswith("_")
+        }
+        exc_text = None
+        if record.exc_info:
+            exc_text = self.redactor.text(self.formatException(record.exc_info))
+
+        if not self.json_lines:
+            line = "%s %s %s: %s" % (
+                self.formatTime(record),
+                record.levelname,
+                record.name,
+                message,
+            )
+            if extra:
+                line += " " + " ".join(f"{k}={v}" for k, v in extra.items())
+            return f"{line}\n{exc_text}" if exc_text else line
+
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": message,
+            **extra,
+        }
+        if exc_text:
+            entry["exc_info"] = exc_text
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread without formatting them.
+
+    The stock ``QueueHandler.prepare`` renders the message on the calling
+    thread; here the record is queued as is, arguments and all, so a log
+    call costs a record and a ``put_nowait``. When the queue is full the
+    record is dropped and counted rather than stalling the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(levels: Iterable[str]) -> dict[str, str]:
+    """Turn ``["sqlalchemy.engine=WARNING", ...]`` into a logger -> level map."""
+    parsed = {}
+    for item in levels:
+        name, sep, level = item.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"Expected logger=LEVEL in LOG_LEVELS, got {item!r}")
+        parsed[name.strip()] = level.strip().upper()
+    return parsed
+
+
+class LogPipeline:
+    """Routes the root logger through a queue drained by a background thread.
+
+    ``start()`` adds a ``NonBlockingQueueHandler`` to the root logger and
+    applies the configured levels; the ``QueueListener`` thread formats and
+    writes each record to stderr. ``stop()`` detaches the handler and
+    drains what is left in the queue.
+    """
+
+    def __init__(
+        self,
+        level: str = "INFO",
+        levels: dict[str, str] | None = None,
+        json_lines: bool = False,
+        queue_size: int = 10_000,
+        redactor: Redactor | None = None,
+        stream=None,
+    ):
+        self.level = level.upper()
+        self.levels = levels or {}
+        self.handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(StructuredFormatter(json_lines, redactor))
+        self._listener = QueueListener(
+            self.handler.queue, output, respect_handler_level=True
+        )
+        self._previous_level: int | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def start(self) -> None:
+        with self._lock:
+            if self._previous_level is not None:
+                return
+            root = logging.getLogger()
+            self._previous_level = root.level
+            root.addHandler(self.handler)
+            root.setLevel(self.level)
+            for name, level in self.levels.items():
+                logging.getLogger(name).setLevel(level)
+            self._listener.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._previous_level is None:
+                return
+            root = logging.getLogger()
+            root.removeHandler(self.handler)
+            root.setLevel(self._previous_level)
+            self._previous_level = None
+            self._listener.stop()
+
+
+log_pipeline = LogPipeline(
+    level=LOG_LEVEL,
+    levels=parse_levels(LOG_LEVELS),
+    json_lines=LOG_FORMAT == "json",
+    queue_size=LOG_QUEUE_SIZE,
+    redactor=Redactor([str(SECRET_KEY), str(SMTP_PASSWORD)]),
+)
+registry.counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log queue was full",
+    function=lambda: log_pipeline.dropped,
+)
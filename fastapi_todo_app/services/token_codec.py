@@ -0,0 +1,134 @@
+from datetime import timedelta
+from typing import Any
+
+from jose import JWTError, jwk, jwt
+from jose.exceptions import ExpiredSignatureError
+
+from fastapi_todo_app.services.signing_keys import KeyRing, key_ring
+from fastapi_todo_app.settings import (
+    EXPIRY_TIME,
+    JWT_BACKEND,
+    REFRESH_TOKEN_EXPIRY_TIME,
+)
+
+
+class JoseBackend:
+    """python-jose, the default."""
+
+    name = "jose"
+
+    def prepare_key(self, material: str, algorithm: str) -> Any:
+        return jwk.construct(material, algorithm)
+
+    def encode(self, claims: dict, key: Any, algorithm: str, headers: dict | None) -> str:
+        return jwt.encode(claims, key, algorithm, headers=headers)
+
+    def decode(self, token: str, key: Any, algorithm: str) -> dict:
+        return jwt.decode(token, key, algorithms=[algorithm])
+
+    def unverified_header(self, token: str) -> dict:
+        return jwt.get_unverified_header(token)
+
+
+class PyJWTBackend:
+    """PyJWT, an optional dependency (``pip install pyjwt``).
+
+    Its errors are re-raised as python-jose's, so callers catch ``JWTError``
+    and ``ExpiredSignatureError`` whichever backend is configured.
+    """
+
+    name = "pyjwt"
+
+    def __init__(self):
+        try:
+            import jwt as pyjwt
+        except ImportError:
+            raise RuntimeError("JWT_BACKEND=pyjwt needs PyJWT: pip install pyjwt")
+        self._jwt = pyjwt
+
+    def prepare_key(self, material: str, algorithm: str) -> Any:
+        return self._jwt.get_algorithm_by_name(algorithm).prepare_key(material)
+
+    def encode(self, claims: dict, key: Any, algorithm: str, headers: dict | None) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str, key: Any, algorithm: str) -> dict:
+        try:
+            return self._jwt.decode(token, key, algorithms=[algorithm])
+        except self._jwt.ExpiredSignatureError as error:
+            raise ExpiredSignatureError(str(error)) from error
+        except self._jwt.PyJWTError as error:
+            raise JWTError(str(error)) from error
+
+    def unverified_header(self, token: str) -> dict:
+        try:
+            return self._jwt.get_unverified_header(token)
+        except self._jwt.PyJWTError as error:
+            raise JWTError(str(error)) from error
+
+
+BACKENDS = {"jose": JoseBackend, "pyjwt": PyJWTBackend}
+
+
+class TokenCodec:
+    """Signs and verifies JWTs with keys and lifetimes prepared once.
+
+    Settings are parsed and keys handed to the backend at construction, so
+    encoding and decoding do no per-call string conversion or key parsing.
+    With a single verification key (the usual case) the token header is not
+    even looked at before verifying.
+    """
+
+    def __init__(
+        self,
+        key_ring: KeyRing,
+        backend: JoseBackend | PyJWTBackend,
+        access_ttl: timedelta,
+        refresh_ttl: timedelta,
+    ):
+        self.backend = backend
+        self.algorithm = key_ring.algorithm
+        self.kid = key_ring.kid
+        self.access_ttl = access_ttl
+        self.refresh_ttl = refresh_ttl
+        self._headers = {"kid": key_ring.kid} if key_ring.kid else None
+        self._signing_key = backend.prepare_key(key_ring.signing_material, self.algorithm)
+        self._verify_keys = {
+            kid: backend.prepare_key(material, self.algorithm)
+            for kid, material in key_ring.verify_material.items()
+        }
+        self._only_key = (
+            next(iter(self._verify_keys.values())) if len(self._verify_keys) == 1 else None
+        )
+
+    def encode(self, claims: dict) -> str:
+        return self.backend.encode(claims, self._signing_key, self.algorithm, self._headers)
+
+    def decode(self, token: str) -> dict:
+        """Verify ``token`` and return its claims.
+
+        With several keys the one named by the token's ``kid`` is used, or
+        the current key when there is none. Raises ``JWTError`` (or
+        ``ExpiredSignatureError``) like ``jose.jwt.decode``.
+        """
+        key = self._only_key
+        if key is None:
+            kid = self.backend.unverified_header(token).get("kid")
+            key = self._verify_keys.get(kid or self.kid)
+            if key is None:
+                raise JWTError("Unknown signing key")
+        return self.backend.decode(token, key, self.algorithm)
+
+
+def create_codec(key_ring: KeyRing = key_ring, backend: str = JWT_BACKEND) -> TokenCodec:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown JWT backend: {backend}")
+    return TokenCodec(
+        key_ring,
+        BACKENDS[backend](),
+        access_ttl=timedelta(minutes=float(str(EXPIRY_TIME))),
+        refresh_ttl=timedelta(days=float(str(REFRESH_TOKEN_EXPIRY_TIME))),
+    )
+
+
+token_codec = create_codec()
@@ -0,0 +1,66 @@
+from typing import TypeVar
+
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import SQLModel, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+TokenModel = TypeVar("TokenModel", bound=SQLModel)
+
+# Token tables hold at most one token per user (unique user_id); issuing a
+# new token replaces the previous one.
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+async def issue_token(session: AsyncSession, token: SQLModel) -> None:
+    """Store ``token`` as its user's only token, replacing any earlier one.
+
+    A single ``INSERT ... ON CONFLICT (user_id) DO UPDATE``; like the rest of
+    the token helpers it does not commit, so the caller can commit the token
+    together with the email that delivers it.
+    """
+    model = type(token)
+    dialect = session.get_bind().dialect.name
+    if dialect not in _INSERTS:
+        raise NotImplementedError(f"Token upserts are not supported on {dialect}")
+    values = token.model_dump(exclude={"id"})
+    statement = _INSERTS[dialect](model).values(**values)
+    statement = statement.on_conflict_do_update(
+        index_elements=[model.user_id],
+        set_={name: statement.excluded[name] for name in values if name != "user_id"},
+    )
+    await session.exec(statement)
+
+
+async def consume_token(
+    session: AsyncSession, model: type[TokenModel], token: str
+) -> TokenModel | None:
+    """Delete the token row matching ``token`` and return it, or None.
+
+    One ``DELETE ... RETURNING``, so two requests racing with the same token
+    cannot both consume it. Expiry is left to the caller; an expired token
+    is consumed all the same. Does not commit.
+    """
+    # Short codes (2FA) are not unique across users, so delete a single row
+    match = (
+        select(model.id)
+        .where(model.token == token)
+        .order_by(col(model.id))
+        .limit(1)
+        .scalar_subquery()
+    )
+    statement = delete(model).where(model.id == match).returning(model)
+    return (await session.exec(statement)).scalars().first()
+
+
+async def consume_user_tokens(
+    session: AsyncSession, model: type[TokenModel], user_id: int
+) -> list[TokenModel]:
+    """Delete every ``model`` row of a user and return them.
+
+    The per-user counterpart of ``consume_token``: one ``DELETE ...
+    RETURNING`` instead of a SELECT followed by a delete per row. Does not
+    commit.
+    """
+    statement = delete(model).where(model.user_id == user_id).returning(model)
+    return list((await session.exec(statement)).scalars().all())
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import col, select
+
+from fastapi_todo_app.db import engine
+from fastapi_todo_app.models.email_outbox import EmailOutbox
+from fastapi_todo_app.models.forgot_password import ForgotPasswordModel
+from fastapi_todo_app.models.refresh_token_family import RefreshTokenFamily
+from fastapi_todo_app.models.two_factor_model import (
+    TwoFactorConfirmation,
+    TwoFactorToken,
+)
+from fastapi_todo_app.models.verification_model import VerificationToken
+from fastapi_todo_app.settings import (
+    OUTBOX_RETENTION,
+    TOKEN_SWEEP_BATCH_SIZE,
+    TOKEN_SWEEP_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary, but fixed: every worker must agree on it
+SWEEP_LOCK_KEY = 0x746F6B6E  # "tokn"
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _utc_now_naive() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _outbox_cutoff() -> datetime:
+    return _utc_now() - timedelta(seconds=OUTBOX_RETENTION)
+
+
+# (model, expiry column, clock, extra condition) -- each clock matches how the
+# rest of the app writes and compares that column. Finished outbox rows are
+# kept for OUTBOX_RETENTION after their last attempt; next_attempt_at is what
+# the (status, next_attempt_at) index covers.
+SWEPT_TABLES = [
+    (TwoFactorToken, TwoFactorToken.expires, _utc_now_naive, None),
+    (TwoFactorConfirmation, TwoFactorConfirmation.expires, datetime.now, None),
+    (VerificationToken, VerificationToken.expires_at, datetime.now, None),
+    (ForgotPasswordModel, ForgotPasswordModel.expires_at, _utc_now, None),
+    (RefreshTokenFamily, RefreshTokenFamily.expires_at, _utc_now, None),
+    (
+        EmailOutbox,
+        EmailOutbox.next_attempt_at,
+        _outbox_cutoff,
+        col(EmailOutbox.status).in_(("sent", "superseded", "failed")),
+    ),
+]
+
+
+class TokenSweeper:
+    """Background task that purges expired token rows and finished emails.
+
+    Rows are deleted in batches of ``batch_size`` picked by a range scan on
+    the table's expiry index, each batch in its own short transaction. On
+    PostgreSQL a pass only runs while holding an advisory lock, so with
+    several workers only one of them sweeps at a time.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine = engine,
+        interval: float = 300,
+        batch_size: int = 1000,
+    ):
+        self.engine = engine
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run(), name="token-sweeper")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Token sweep failed")
+            await asyncio.sleep(self.interval)
+
+    async def sweep_once(self) -> dict[str, int] | None:
+        """Purge every expired token and return the rows deleted per table.
+
+        Returns None when another worker holds the sweep lock.
+        """
+        start = time.perf_counter()
+        purged: dict[str, int] = {}
+        async with self.engine.connect() as conn:
+            use_lock = conn.dialect.name == "postgresql"
+            if use_lock:
+                acquired = (
+                    await conn.execute(
+                        text("SELECT pg_try_advisory_lock(:key)"),
+                        {"key": SWEEP_LOCK_KEY},
+                    )
+                ).scalar()
+                await conn.commit()
+                if not acquired:
+                    return None
+            try:
+                for model, column, clock, condition in SWEPT_TABLES:
+                    purged[model.__tablename__] = await self._purge(
+                        conn, model, column, clock(), condition
+                    )
+            finally:
+                if use_lock:
+                    await conn.execute(
+                        text("SELECT pg_advisory_unlock(:key)"),
+                        {"key": SWEEP_LOCK_KEY},
+                    )
+                    await conn.commit()
+
+        logger.info(
+            "Token sweep purged %d rows in %.1fms (%s)",
+            sum(purged.values()),
+            (time.perf_counter() - start) * 1000,
+            ", ".join(f"{table}={count}" for table, count in purged.items()),
+        )
+        return purged
+
+    async def _purge(self, conn, model, column, cutoff: datetime, condition) -> int:
+        expired = select(model.id).where(column < cutoff)
+        if condition is not None:
+            expired = expired.where(condition)
+        expired = expired.order_by(col(column)).limit(self.batch_size).scalar_subquery()
+        statement = delete(model).where(col(model.id).in_(expired))
+        total = 0
+        while True:
+            deleted = (await conn.execute(statement)).rowcount
+            await conn.commit()
+            total += deleted
+            if deleted < self.batch_size:
+                return total
+
+
+token_sweeper = TokenSweeper(
+    interval=TOKEN_SWEEP_INTERVAL,
+    batch_size=TOKEN_SWEEP_BATCH_SIZE,
+)
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from fastapi_todo_app.models.two_factor_model import (
+    TwoFactorConfirmation,
+    TwoFactorToken,
+)
+from fastapi_todo_app.services.auth import generate_two_factor_token
+from fastapi_todo_app.services.ephemeral_store import EphemeralStore, create_store
+from fastapi_todo_app.services.token_repository import (
+    consume_token,
+    consume_user_tokens,
+    issue_token,
+)
+from fastapi_todo_app.settings import REDIS_URL, TWO_FACTOR_STORE
+
+# How long a 2FA code, and then the confirmation it turns into, stays valid
+TWO_FACTOR_TTL = timedelta(minutes=10)
+
+
+class DatabaseTwoFactorCodes:
+    """2FA codes and confirmations kept in the relational tables."""
+
+    async def issue_code(self, session: AsyncSession, user_id: int) -> str:
+        """Replace the user's code with a new one. Does not commit."""
+        code = generate_two_factor_token()
+        await issue_token(
+            session,
+            TwoFactorToken(
+                token=code,
+                expires=datetime.now(timezone.utc) + TWO_FACTOR_TTL,
+                user_id=user_id,
+            ),
+        )
+        return code
+
+    async def redeem_code(self, session: AsyncSession, code: str) -> int:
+        """Consume a code and record a confirmation for its user."""
+        token_record = await consume_token(session, TwoFactorToken, code)
+
+        if not token_record:
+            raise HTTPException(status_code=404, detail="Invalid 2FA code")
+
+        token_expires = token_record.expires.replace(tzinfo=timezone.utc)
+        if token_expires < datetime.now(timezone.utc):
+            await session.commit()
+            raise HTTPException(status_code=400, detail="2FA code has expired")
+
+        session.add(
+            TwoFactorConfirmation(
+                expires=datetime.now() + TWO_FACTOR_TTL, user_id=token_record.user_id
+            )
+        )
+        await session.commit()
+        return token_record.user_id
+
+    async def take_confirmation(
+        self, session: AsyncSession, user_id: int
+    ) -> bool | None:
+        """Use up the user's confirmations.
+
+        Returns None when there are none, False when they have all expired.
+        """
+        confirmations = await consume_user_tokens(
+            session, TwoFactorConfirmation, user_id
+        )
+        if not confirmations:
+            return None
+        await session.commit()
+        return any(datetime.now() <= conf.expires for conf in confirmations)
+
+    async def close(self) -> None:
+        pass
+
+
+class EphemeralTwoFactorCodes:
+    """2FA codes and confirmations kept in an ``EphemeralStore`` with a TTL.
+
+    Nothing is written to the database. An expired code or confirmation
+    simply disappears, so it reads as unknown rather than expired.
+    """
+
+    def __init__(self, store: EphemeralStore, max_attempts: int = 5):
+        self.store = store
+        self.max_attempts = max_attempts
+
+    async def issue_code(self, session: AsyncSession, user_id: int) -> str:
+        ttl = TWO_FACTOR_TTL.total_seconds()
+        previous = await self.store.pop(f"2fa:user:{user_id}")
+        if previous is not None:
+            await self.store.delete(f"2fa:code:{previous}")
+        # Codes are looked up on their own, so they must not collide
+        for _ in range(self.max_attempts):
+            code = generate_two_factor_token()
+            if await self.store.set(
+                f"2fa:code:{code}", str(user_id), ttl, only_if_absent=True
+            ):
+                await self.store.set(f"2fa:user:{user_id}", code, ttl)
+                return code
+        raise HTTPException(
+            status_code=503, detail="Could not issue a 2FA code, please retry"
+        )
+
+    async def redeem_code(self, session: AsyncSession, code: str) -> int:
+        user_id = await self.store.pop(f"2fa:code:{code}")
+        if user_id is None:
+            raise HTTPException(status_code=404, detail="Invalid 2FA code")
+        await self.store.delete(f"2fa:user:{user_id}")
+        await self.store.set(
+            f"2fa:confirmed:{user_id}", "1", TWO_FACTOR_TTL.total_seconds()
+        )
+        return int(user_id)
+
+    async def take_confirmation(
+        self, session: AsyncSession, user_id: int
+    ) -> bool | None:
+        return True if await self.store.pop(f"2fa:confirmed:{user_id}") else None
+
+    async def close(self) -> None:
+        await self.store.close()
+
+
+def create_two_factor_codes(backend: str):
+    if backend == "database":
+        return DatabaseTwoFactorCodes()
+    return EphemeralTwoFactorCodes(create_store(backend, REDIS_URL))
+
+
+two_factor_codes = create_two_factor_codes(TWO_FACTOR_STORE)
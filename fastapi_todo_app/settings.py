@@ -1,27 +1,111 @@
+import logging
+
 from starlette.config import Config
-from starlette.datastructures import Secret
+from starlette.datastructures import CommaSeparatedStrings, Secret
 
 try:
     config = Config(".env")
 except FileNotFoundError:
-    print("Warning: No .env file found")
+    logging.getLogger(__name__).warning("No .env file found")
     config = Config()
 
 DATABASE_URL = config("DATABASE_URL", cast=Secret)
+# Log every SQL statement (development only)
+DB_ECHO = config("DB_ECHO", cast=bool, default=False)
+# SQL instrumentation: statements slower than this are logged with their
+# route (ms), and a request repeating one statement this many times is
+# reported as a likely N+1. SERVER_TIMING adds per-request DB time and
+# statement count as a Server-Timing header.
+SQL_SLOW_QUERY_MS = config("SQL_SLOW_QUERY_MS", cast=float, default=200)
+SQL_N_PLUS_ONE_THRESHOLD = config("SQL_N_PLUS_ONE_THRESHOLD", cast=int, default=10)
+SERVER_TIMING = config("SERVER_TIMING", cast=bool, default=True)
+# Serve Prometheus metrics on /metrics; restrict it at the proxy when exposed
+METRICS_ENABLED = config("METRICS_ENABLED", cast=bool, default=True)
+# Logging: records are queued and written by a background thread, with
+# tokens and secrets redacted. LOG_LEVELS overrides single loggers, e.g.
+# "fastapi_todo_app.services.auth=DEBUG,sqlalchemy.engine=WARNING".
+# LOG_FORMAT is "text" or "json" (one object per line).
+LOG_LEVEL = config("LOG_LEVEL", cast=str, default="INFO")
+LOG_LEVELS = config("LOG_LEVELS", cast=CommaSeparatedStrings, default="")
+LOG_FORMAT = config("LOG_FORMAT", cast=str, default="text")
+LOG_QUEUE_SIZE = config("LOG_QUEUE_SIZE", cast=int, default=10000)
 TEST_DATABASE_URL = config("TEST_DATABASE_URL", cast=Secret)
 SECRET_KEY = config("SECRET_KEY", cast=Secret)
 ALGORITHM = config("ALGORITHM", cast=Secret)
+# Asymmetric signing (RS256/ES256...): PEM private key of the current key, and
+# public keys of retired keys still accepted and published in the JWKS
+JWT_PRIVATE_KEY_FILE = config("JWT_PRIVATE_KEY_FILE", cast=str, default="")
+JWT_RETIRED_PUBLIC_KEY_FILES = config(
+    "JWT_RETIRED_PUBLIC_KEY_FILES", cast=CommaSeparatedStrings, default=""
+)
+# JWT library: "jose" (python-jose) or "pyjwt" (needs PyJWT installed)
+JWT_BACKEND = config("JWT_BACKEND", cast=str, default="jose")
+# Cache-Control max-age of /.well-known/jwks.json (seconds)
+JWKS_MAX_AGE = config("JWKS_MAX_AGE", cast=int, default=300)
 EXPIRY_TIME = config("EXPIRY_TIME", cast=Secret)
 REFRESH_TOKEN_EXPIRY_TIME = config("REFRESH_TOKEN_EXPIRY_TIME", cast=Secret)
 EMAIL_VERIFICATION_TOKEN_EXPIRY_TIME = config(
     "EMAIL_VERIFICATION_TOKEN_EXPIRY_TIME", cast=int
 )
+# Cache of verified access token claims (seconds; 0 disables)
+JWT_CLAIMS_CACHE_SIZE = config("JWT_CLAIMS_CACHE_SIZE", cast=int, default=10000)
+JWT_CLAIMS_CACHE_TTL = config("JWT_CLAIMS_CACHE_TTL", cast=int, default=300)
+# Cache of user snapshots used by the todo routes (seconds; 0 disables)
+PRINCIPAL_CACHE_SIZE = config("PRINCIPAL_CACHE_SIZE", cast=int, default=10000)
+PRINCIPAL_CACHE_TTL = config("PRINCIPAL_CACHE_TTL", cast=int, default=60)
+# Stateless principal mode: access tokens carry uid/role/version claims so
+# the todo routes never load the user row
+STATELESS_PRINCIPAL = config("STATELESS_PRINCIPAL", cast=bool, default=False)
+TOKEN_VERSION_CACHE_TTL = config("TOKEN_VERSION_CACHE_TTL", cast=int, default=30)
+# How long another worker may keep answering 304 for a changed todo list
+TODOS_VERSION_CACHE_TTL = config("TODOS_VERSION_CACHE_TTL", cast=int, default=5)
+# Password hashing worker pool ("thread" or "process"; 0 workers = one per CPU)
+PASSWORD_HASH_EXECUTOR = config("PASSWORD_HASH_EXECUTOR", cast=str, default="thread")
+PASSWORD_HASH_WORKERS = config("PASSWORD_HASH_WORKERS", cast=int, default=0)
+PASSWORD_HASH_MAX_PENDING = config("PASSWORD_HASH_MAX_PENDING", cast=int, default=64)
 # SMTP Settings
 SMTP_HOST = config("SMTP_HOST", cast=str)
 SMTP_PORT = config("SMTP_PORT", cast=int)
 SMTP_USER = config("SMTP_USER", cast=str)
 SMTP_PASSWORD = config("SMTP_PASSWORD", cast=Secret)
 SMTP_FROM_EMAIL = config("SMTP_FROM_EMAIL", cast=str)
+SMTP_STARTTLS = config("SMTP_STARTTLS", cast=bool, default=True)
+SMTP_TIMEOUT = config("SMTP_TIMEOUT", cast=int, default=10)
+# Kept-alive SMTP connections (seconds)
+SMTP_POOL_SIZE = config("SMTP_POOL_SIZE", cast=int, default=2)
+SMTP_POOL_MAX_IDLE = config("SMTP_POOL_MAX_IDLE", cast=int, default=60)
+# GET /todos/ page size
+TODO_PAGE_DEFAULT_LIMIT = config("TODO_PAGE_DEFAULT_LIMIT", cast=int, default=50)
+TODO_PAGE_MAX_LIMIT = config("TODO_PAGE_MAX_LIMIT", cast=int, default=200)
+# Largest number of creates + updates + deletes accepted by POST /todos/bulk
+TODO_BULK_MAX_ITEMS = config("TODO_BULK_MAX_ITEMS", cast=int, default=500)
+# Rows fetched per server-side cursor round trip by GET /todos/export
+TODO_EXPORT_BATCH_SIZE = config("TODO_EXPORT_BATCH_SIZE", cast=int, default=500)
+# Email outbox dispatcher (seconds)
+OUTBOX_BATCH_SIZE = config("OUTBOX_BATCH_SIZE", cast=int, default=50)
+OUTBOX_POLL_INTERVAL = config("OUTBOX_POLL_INTERVAL", cast=float, default=5)
+OUTBOX_MAX_ATTEMPTS = config("OUTBOX_MAX_ATTEMPTS", cast=int, default=5)
+OUTBOX_RETRY_BACKOFF = config("OUTBOX_RETRY_BACKOFF", cast=float, default=2)
+OUTBOX_LEASE = config("OUTBOX_LEASE", cast=float, default=60)
+OUTBOX_RETENTION = config("OUTBOX_RETENTION", cast=float, default=86400)
+# Where 2FA codes and confirmations live: "database", "memory" (single worker
+# only) or "redis"
+TWO_FACTOR_STORE = config("TWO_FACTOR_STORE", cast=str, default="database")
+REDIS_URL = config("REDIS_URL", cast=str, default="redis://localhost:6379/0")
+# Rate limits for /token, /user/forgot-password and
+# /user/resend-verification-email, as "<requests>/<seconds>" per endpoint.
+# The "memory" backend counts per worker; use "redis" to share the counters.
+RATE_LIMIT_ENABLED = config("RATE_LIMIT_ENABLED", cast=bool, default=True)
+RATE_LIMIT_BACKEND = config("RATE_LIMIT_BACKEND", cast=str, default="memory")
+RATE_LIMIT_PER_IP = config("RATE_LIMIT_PER_IP", cast=str, default="30/60")
+RATE_LIMIT_PER_ACCOUNT = config("RATE_LIMIT_PER_ACCOUNT", cast=str, default="5/60")
+# Expired token sweeper; an interval of 0 disables it
+TOKEN_SWEEP_INTERVAL = config("TOKEN_SWEEP_INTERVAL", cast=float, default=300)
+TOKEN_SWEEP_BATCH_SIZE = config("TOKEN_SWEEP_BATCH_SIZE", cast=int, default=1000)
+# How often each worker reloads revoked refresh token families (seconds)
+REFRESH_REVOCATION_SYNC_INTERVAL = config(
+    "REFRESH_REVOCATION_SYNC_INTERVAL", cast=float, default=5
+)
 
 # Frontend URL for email verification
 FRONTEND_URL = config("FRONTEND_URL", cast=str, default="http://localhost:8003")
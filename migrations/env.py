@@ -0,0 +1,64 @@
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+# Import every model so SQLModel.metadata describes the whole schema
+import fastapi_todo_app.models.email_outbox  # noqa: F401
+import fastapi_todo_app.models.forgot_password  # noqa: F401
+import fastapi_todo_app.models.refresh_token_family  # noqa: F401
+import fastapi_todo_app.models.todo_model  # noqa: F401
+import fastapi_todo_app.models.two_factor_model  # noqa: F401
+import fastapi_todo_app.models.user_model  # noqa: F401
+import fastapi_todo_app.models.verification_model  # noqa: F401
+from fastapi_todo_app.db import connection_string
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = SQLModel.metadata
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL to stdout instead of running it."""
+    context.configure(
+        url=connection_string,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(connection=connection, target_metadata=target_metadata)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    connectable = create_async_engine(connection_string, poolclass=pool.NullPool)
+
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await connectable.dispose()
+
+
+def run_migrations_online() -> None:
+    asyncio.run(run_async_migrations())
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
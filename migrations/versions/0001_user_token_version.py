@@ -0,0 +1,39 @@
+"""add user.token_version
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Tables are still created by create_tables() on startup, so a fresh database
+may already have this column; the migration only adds what is missing.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return any(c["name"] == column for c in inspector.get_columns(table))
+
+
+def upgrade() -> None:
+    if not _has_column("user", "token_version"):
+        op.add_column(
+            "user",
+            sa.Column(
+                "token_version", sa.Integer(), nullable=False, server_default="0"
+            ),
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("user") as batch_op:
+        batch_op.drop_column("token_version")
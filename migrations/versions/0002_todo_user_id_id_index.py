@@ -0,0 +1,32 @@
+"""add composite (user_id, id) index on todo
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+Backs keyset pagination of GET /todos/.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_index(table: str, name: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return any(index["name"] == name for index in inspector.get_indexes(table))
+
+
+def upgrade() -> None:
+    if not _has_index("todo", "ix_todo_user_id_id"):
+        op.create_index("ix_todo_user_id_id", "todo", ["user_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todo_user_id_id", table_name="todo")
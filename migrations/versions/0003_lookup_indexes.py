@@ -0,0 +1,72 @@
+"""index token and user_id lookups, make username/email unique
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+Adds unique indexes on the verification and password reset tokens, indexes
+on the user_id columns the token tables are queried by, and turns the
+username/email indexes into unique ones. Drops ix_todo_task and ix_user_name,
+which no query reads; todo.user_id is served by ix_todo_user_id_id.
+
+Upgrading fails if the user table already holds duplicate usernames or emails;
+resolve those first.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns, unique)
+INDEXES = [
+    ("ix_user_username", "user", ["username"], True),
+    ("ix_user_email", "user", ["email"], True),
+    ("ix_email_verification_tokens_token", "email_verification_tokens", ["token"], True),
+    ("ix_email_verification_tokens_user_id", "email_verification_tokens", ["user_id"], False),
+    ("ix_forgot_password_tokens_token", "forgot_password_tokens", ["token"], True),
+    ("ix_forgot_password_tokens_user_id", "forgot_password_tokens", ["user_id"], False),
+    ("ix_two_factor_tokens_user_id", "two_factor_tokens", ["user_id"], False),
+    ("ix_two_factor_confirmations_user_id", "two_factor_confirmations", ["user_id"], False),
+]
+UNUSED_INDEXES = [
+    ("ix_todo_task", "todo", ["task"]),
+    ("ix_user_name", "user", ["name"]),
+]
+
+
+def _get_index(table: str, name: str) -> dict | None:
+    inspector = sa.inspect(op.get_bind())
+    for index in inspector.get_indexes(table):
+        if index["name"] == name:
+            return index
+    return None
+
+
+def upgrade() -> None:
+    for name, table, _ in UNUSED_INDEXES:
+        if _get_index(table, name) is not None:
+            op.drop_index(name, table_name=table)
+
+    for name, table, columns, unique in INDEXES:
+        existing = _get_index(table, name)
+        if existing is not None and bool(existing["unique"]) == unique:
+            continue
+        if existing is not None:
+            op.drop_index(name, table_name=table)
+        op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    for name, table, columns, unique in INDEXES:
+        op.drop_index(name, table_name=table)
+        if name in ("ix_user_username", "ix_user_email"):
+            op.create_index(name, table, columns)
+
+    for name, table, columns in UNUSED_INDEXES:
+        op.create_index(name, table, columns)
@@ -0,0 +1,42 @@
+"""index token expiry columns
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+Lets the expired token sweeper find expired rows with an index range scan.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, column)
+INDEXES = [
+    ("ix_two_factor_tokens_expires", "two_factor_tokens", "expires"),
+    ("ix_two_factor_confirmations_expires", "two_factor_confirmations", "expires"),
+    ("ix_email_verification_tokens_expires_at", "email_verification_tokens", "expires_at"),
+    ("ix_forgot_password_tokens_expires_at", "forgot_password_tokens", "expires_at"),
+]
+
+
+def _has_index(table: str, name: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return any(index["name"] == name for index in inspector.get_indexes(table))
+
+
+def upgrade() -> None:
+    for name, table, column in INDEXES:
+        if not _has_index(table, name):
+            op.create_index(name, table, [column])
+
+
+def downgrade() -> None:
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
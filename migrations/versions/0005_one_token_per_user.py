@@ -0,0 +1,52 @@
+"""one token per user in each token table
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+Makes user_id unique in email_verification_tokens, forgot_password_tokens and
+two_factor_tokens, which token issuance upserts on. Older duplicates are
+deleted first, keeping each user's newest token.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ["email_verification_tokens", "forgot_password_tokens", "two_factor_tokens"]
+
+
+def _get_index(table: str, name: str) -> dict | None:
+    inspector = sa.inspect(op.get_bind())
+    for index in inspector.get_indexes(table):
+        if index["name"] == name:
+            return index
+    return None
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        name = f"ix_{table}_user_id"
+        existing = _get_index(table, name)
+        if existing is not None and existing["unique"]:
+            continue
+        op.execute(
+            f"DELETE FROM {table} WHERE id NOT IN "
+            f"(SELECT MAX(id) FROM {table} GROUP BY user_id)"
+        )
+        if existing is not None:
+            op.drop_index(name, table_name=table)
+        op.create_index(name, table, ["user_id"], unique=True)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        name = f"ix_{table}_user_id"
+        op.drop_index(name, table_name=table)
+        op.create_index(name, table, ["user_id"])
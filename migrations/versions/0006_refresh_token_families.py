@@ -0,0 +1,43 @@
+"""add refresh_token_families
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+
+One row per login; tracks the newest refresh token of the family and
+whether the family has been revoked. Skipped if create_tables() already
+made the table.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = "refresh_token_families"
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table(TABLE):
+        return
+    op.create_table(
+        TABLE,
+        sa.Column("id", sa.String(length=32), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+        sa.Column("current_jti", sa.String(length=32), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("expires_at", sa.DateTime(timezone=True)),
+        sa.Column("revoked_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index(f"ix_{TABLE}_user_id", TABLE, ["user_id"])
+    op.create_index(f"ix_{TABLE}_expires_at", TABLE, ["expires_at"])
+    op.create_index(f"ix_{TABLE}_revoked_at", TABLE, ["revoked_at"])
+
+
+def downgrade() -> None:
+    op.drop_table(TABLE)
@@ -0,0 +1,41 @@
+"""add todo.version and user.todos_version
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+
+Versions behind the ETags of GET /todos/{id} and GET /todos/. Existing rows
+start at todo.version 1 and user.todos_version 0.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [("todo", "version", "1"), ("user", "todos_version", "0")]
+
+
+def _has_column(table: str, column: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return any(c["name"] == column for c in inspector.get_columns(table))
+
+
+def upgrade() -> None:
+    for table, column, default in COLUMNS:
+        if not _has_column(table, column):
+            op.add_column(
+                table,
+                sa.Column(column, sa.Integer(), nullable=False, server_default=default),
+            )
+
+
+def downgrade() -> None:
+    for table, column, _ in COLUMNS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column(column)
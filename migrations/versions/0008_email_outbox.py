@@ -0,0 +1,48 @@
+"""add email_outbox
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+
+Emails waiting for the outbox dispatcher, written in the same transaction
+as the token they carry. Skipped if create_tables() already made the table.
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = "email_outbox"
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table(TABLE):
+        return
+    op.create_table(
+        TABLE,
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("to_email", sa.String(length=255), nullable=False),
+        sa.Column("token", sa.String(), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("user.id")),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.String()),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True)),
+        sa.Column("sent_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index(
+        f"ix_{TABLE}_status_next_attempt_at", TABLE, ["status", "next_attempt_at"]
+    )
+    op.create_index(f"ix_{TABLE}_user_id_kind", TABLE, ["user_id", "kind"])
+
+
+def downgrade() -> None:
+    op.drop_table(TABLE)
@@ -5,12 +5,30 @@ Imports the pytest module, which is a popular testing framework for Python.
 import pytest
 from fastapi.testclient import TestClient
 from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from fastapi_todo_app import settings
-from fastapi_todo_app.main import app, get_session
+from fastapi_todo_app.main import app, get_session, get_session_factory
+from fastapi_todo_app.models.email_outbox import EmailOutbox
+from fastapi_todo_app.models.forgot_password import ForgotPasswordModel
+from fastapi_todo_app.models.refresh_token_family import RefreshTokenFamily
 from fastapi_todo_app.models.todo_model import Todo
+from fastapi_todo_app.models.two_factor_model import (
+    TwoFactorConfirmation,
+    TwoFactorToken,
+)
 from fastapi_todo_app.models.user_model import User
+from fastapi_todo_app.models.verification_model import VerificationToken
+from fastapi_todo_app.services.auth import claims_cache
+from fastapi_todo_app.services.principal import (
+    principal_cache,
+    todos_versions,
+    token_versions,
+)
+from fastapi_todo_app.services.rate_limit import rate_limiter
 
 """
 Creates a SQLModel engine for the test database, using the connection string from the application settings. The engine is configured with the following options:
@@ -20,6 +38,8 @@ Creates a SQLModel engine for the test database, using the connection string fro
 - `pool_size=5`: Sets the connection pool size to 5 connections.
 - `echo=True`: Enables SQL statement logging for debugging purposes.
 
+The application itself talks to the database through an `AsyncSession`, so a second, async engine is created on the same test database. It uses `NullPool` because every `TestClient` runs the app on its own event loop and async connections cannot be shared between loops.
+
 Additionally, a CryptContext instance is created for hashing passwords using the bcrypt algorithm.
 """
 connection_string = str(settings.TEST_DATABASE_URL).replace(
@@ -32,6 +52,11 @@ engine = create_engine(
     pool_size=5,
     echo=True,
 )
+async_engine = create_async_engine(
+    connection_string,
+    connect_args={"sslmode": "require"},
+    poolclass=NullPool,
+)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -54,16 +79,22 @@ def get_db_session():
 """
 A pytest fixture that creates a test client for the FastAPI application, with the database session overridden to use a test session.
 
-This fixture is marked as `autouse=True`, meaning it will be automatically applied to all tests in the module. It creates a new database session using the `get_db_session` fixture, and then overrides the `get_session` dependency in the FastAPI application to use this test session. Finally, it creates a TestClient instance for the FastAPI application and yields it, allowing the tests to use the test client to make requests to the application.
+This fixture is marked as `autouse=True`, meaning it will be automatically applied to all tests in the module. It depends on the `get_db_session` fixture so the schema exists, and then overrides the `get_session` dependency in the FastAPI application to yield an `AsyncSession` bound to the test database, and `get_session_factory` (used by streamed responses) to create such sessions. Rate limiting is switched off, since every test logs in again from the same client. Finally, it creates a TestClient instance for the FastAPI application and yields it, allowing the tests to use the test client to make requests to the application.
 """
 
 
 @pytest.fixture(autouse=True)
 def test_app(get_db_session):
-    def test_session():
-        yield get_db_session
+    async def test_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    def test_session_factory():
+        return lambda: AsyncSession(async_engine, expire_on_commit=False)
 
     app.dependency_overrides[get_session] = test_session
+    app.dependency_overrides[get_session_factory] = test_session_factory
+    rate_limiter.enabled = False
     with TestClient(app=app) as client:
         yield client
 
@@ -71,9 +102,11 @@ def test_app(get_db_session):
 """
 A pytest fixture that creates a test user in the database for each test module.
 
-This fixture creates a new `User` instance with the email "test@example.com", username "testuser", and a hashed password of "testpassword". It adds the user to the database session and commits the changes.
+This fixture creates a new, already verified `User` instance with the email "test@example.com", username "testuser", and a hashed password of "testpassword". It adds the user to the database session and commits the changes.
+
+The user is recreated for every test, so the in-process principal, claims, token version and todo list version caches are cleared before and after it; entries for a deleted user must not outlive it.
 
-After the tests in the module have completed, the fixture deletes any `Todo` objects associated with the test user, deletes the test user, commits the changes, and closes the database session.
+After the tests in the module have completed, the fixture deletes any todos, queued emails and tokens associated with the test user, deletes the test user, commits the changes, and closes the database session.
 
 This fixture is marked as `autouse=True`, meaning it will be automatically applied to all tests in the module. It ensures that a test user is available for any tests that require authentication or user-specific data.
 """
@@ -81,19 +114,33 @@ This fixture is marked as `autouse=True`, meaning it will be automatically appli
 
 @pytest.fixture(autouse=True)
 def create_test_user(get_db_session):
+    for cache in (principal_cache, claims_cache, token_versions, todos_versions):
+        cache.clear()
     test_user = User(
         email="test@example.com",
         username="testuser",
         password=pwd_context.hash("testpassword"),
+        is_verified=True,
     )
     get_db_session.add(test_user)
     get_db_session.commit()
     yield test_user
 
-    get_db_session.query(Todo).filter(Todo.user_id == test_user.id).delete()
+    for model in (
+        Todo,
+        EmailOutbox,
+        ForgotPasswordModel,
+        VerificationToken,
+        TwoFactorToken,
+        TwoFactorConfirmation,
+        RefreshTokenFamily,
+    ):
+        get_db_session.query(model).filter(model.user_id == test_user.id).delete()
     get_db_session.delete(test_user)
     get_db_session.commit()
     get_db_session.close()
+    for cache in (principal_cache, claims_cache, token_versions, todos_versions):
+        cache.clear()
 
 
 """
@@ -0,0 +1,141 @@
+"""
+A minimal Redis stand-in that keeps its keys in memory.
+
+It speaks RESP and implements the handful of commands the app uses (PING, AUTH, SELECT, SET with PX/NX, GET, GETDEL, DEL, INCR/INCRBY, PEXPIRE), with key expiry, so the Redis backends can be tested against a real socket without a Redis server.
+"""
+
+import socketserver
+import threading
+import time
+
+
+class _RedisHandler(socketserver.StreamRequestHandler):
+    def reply(self, value):
+        if value is None:
+            data = b"$-1\r\n"
+        elif isinstance(value, int):
+            data = b":%d\r\n" % value
+        elif isinstance(value, Exception):
+            data = f"-ERR {value}\r\n".encode()
+        elif value == "OK" or value == "PONG":
+            data = f"+{value}\r\n".encode()
+        else:
+            encoded = value.encode()
+            data = b"$%d\r\n%s\r\n" % (len(encoded), encoded)
+        self.wfile.write(data)
+
+    def read_command(self) -> list[str] | None:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2].decode())
+        return args
+
+    def handle(self):
+        stub = self.server.stub
+        with stub.lock:
+            stub.connections += 1
+            stub.open_sockets.append(self.connection)
+        while True:
+            try:
+                args = self.read_command()
+            except (OSError, ValueError):
+                return
+            if args is None:
+                return
+            with stub.lock:
+                stub.commands.append(args)
+                try:
+                    result = stub.execute(args[0].upper(), args[1:])
+                except Exception as error:
+                    result = error
+            try:
+                self.reply(result)
+            except OSError:
+                return
+
+
+class RedisStub:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.data: dict[str, tuple[str, float | None]] = {}
+        self.commands: list[list[str]] = []
+        self.connections = 0
+        self.open_sockets = []
+        self.lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), _RedisHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self.host, self.port = self._server.server_address
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    def _get(self, key: str) -> str | None:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry[0]
+
+    def execute(self, command: str, args: list[str]):
+        if command == "PING":
+            return "PONG"
+        if command in ("AUTH", "SELECT"):
+            return "OK"
+        if command == "SET":
+            key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+            if "NX" in options and self._get(key) is not None:
+                return None
+            deadline = None
+            if "PX" in options:
+                deadline = time.monotonic() + int(args[2 + options.index("PX") + 1]) / 1000
+            self.data[key] = (value, deadline)
+            return "OK"
+        if command == "GET":
+            return self._get(args[0])
+        if command == "GETDEL":
+            value = self._get(args[0])
+            self.data.pop(args[0], None)
+            return value
+        if command in ("INCR", "INCRBY"):
+            current = self._get(args[0])
+            deadline = self.data[args[0]][1] if current is not None else None
+            value = int(current or 0) + (int(args[1]) if command == "INCRBY" else 1)
+            self.data[args[0]] = (str(value), deadline)
+            return value
+        if command == "PEXPIRE":
+            if self._get(args[0]) is None:
+                return 0
+            deadline = time.monotonic() + int(args[1]) / 1000
+            self.data[args[0]] = (self.data[args[0]][0], deadline)
+            return 1
+        if command == "DEL":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        raise ValueError(f"unknown command '{command}'")
+
+    def start(self) -> "RedisStub":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def drop_connections(self):
+        """Close every client connection from the server side."""
+        with self.lock:
+            sockets, self.open_sockets = self.open_sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(2)
+            except OSError:
+                pass
+            sock.close()
+
+    def stop(self):
+        self.drop_connections()
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,142 @@
+"""
+A minimal SMTP server that accepts every message and keeps it in memory.
+
+It speaks just enough SMTP (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT) for `smtplib` clients, without STARTTLS or AUTH, so tests and benchmarks can send real mail over a local socket.
+
+Messages are also sorted into a parsed inbox per recipient; `next_message` waits for the next one from async code, which is how the load test reads 2FA codes.
+"""
+
+import asyncio
+import email
+import email.policy
+import socketserver
+import threading
+from collections import defaultdict, deque
+from email.message import EmailMessage
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink = self.server.sink
+        with sink.lock:
+            sink.connections += 1
+            sink.open_sockets.append(self.connection)
+        self.reply("220 smtp-sink ready")
+        mail_from, rcpt_to = None, []
+        while True:
+            try:
+                line = self.rfile.readline()
+            except OSError:
+                return
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 smtp-sink")
+            elif verb == "MAIL":
+                mail_from, rcpt_to = command[10:].strip("<>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                rcpt_to.append(command[8:].strip("<>").lower())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk in (b".\r\n", b""):
+                        break
+                    # Undo dot-stuffing
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                sink.deliver(mail_from, rcpt_to, b"".join(data))
+                self.reply("250 OK")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSink:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.messages: list[tuple[str, list[str], str]] = []
+        self.inboxes: defaultdict[str, deque[EmailMessage]] = defaultdict(deque)
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self.connections = 0
+        self.open_sockets = []
+        self.lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), _SMTPHandler)
+        self._server.daemon_threads = True
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+
+    @property
+    def delivered(self) -> int:
+        return len(self.messages)
+
+    def deliver(self, mail_from: str, rcpt_to: list[str], data: bytes):
+        message = email.message_from_bytes(data, policy=email.policy.default)
+        with self.lock:
+            self.messages.append((mail_from, rcpt_to, data.decode()))
+            for recipient in rcpt_to:
+                self.inboxes[recipient].append(message)
+            for loop, event in self._waiters:
+                loop.call_soon_threadsafe(event.set)
+
+    async def next_message(self, address: str, timeout: float = 10) -> EmailMessage:
+        """Wait for the next unread message to an address and take it."""
+        address = address.lower()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            event = asyncio.Event()
+            with self.lock:
+                if self.inboxes[address]:
+                    return self.inboxes[address].popleft()
+                waiter = (loop, event)
+                self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(event.wait(), deadline - loop.time())
+            finally:
+                with self.lock:
+                    self._waiters.remove(waiter)
+
+    def discard(self, address: str):
+        """Forget the unread messages to an address."""
+        with self.lock:
+            self.inboxes.pop(address.lower(), None)
+
+    def start(self) -> "SMTPSink":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def drop_connections(self):
+        """Close every client connection from the server side."""
+        with self.lock:
+            sockets, self.open_sockets = self.open_sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(2)
+            except OSError:
+                pass
+            sock.close()
+
+    def stop(self):
+        self.drop_connections()
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def message_text(message: EmailMessage) -> str:
+    """The decoded text of every text part of a message."""
+    return "\n".join(
+        part.get_content()
+        for part in message.walk()
+        if part.get_content_maintype() == "text"
+    )
@@ -0,0 +1,131 @@
+import pytest
+
+from conftest import pwd_context
+from fastapi_todo_app.models.refresh_token_family import RefreshTokenFamily
+from fastapi_todo_app.models.todo_model import Todo
+from fastapi_todo_app.models.user_model import User
+from fastapi_todo_app.services.cache import TTLCache
+from fastapi_todo_app.services.principal import (
+    UserPrincipal,
+    invalidate_principal,
+    principal_cache,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_at_min_of_deadline_and_ttl():
+    """
+    Test that an entry expires at whichever comes first: its own deadline or the cache TTL.
+    """
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("short", "a", expires_at=clock.now + 5)
+    cache.set("long", "b", expires_at=clock.now + 3600)
+
+    clock.now += 10
+    assert cache.get("short") is None
+    assert cache.get("long") == "b"
+
+    clock.now += 60
+    assert cache.get("long") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    """
+    Test that the cache stays within its size limit by evicting the least recently used entry.
+    """
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_invalidate():
+    """
+    Test that an entry can be invalidated explicitly and that a zero-sized cache stores nothing.
+    """
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("token", {"sub": "testuser"})
+    assert cache.invalidate("token") is True
+    assert cache.invalidate("token") is False
+    assert cache.get("token") is None
+
+    disabled = TTLCache(maxsize=0, ttl=60)
+    disabled.set("token", {"sub": "testuser"})
+    assert disabled.get("token") is None
+
+
+def test_user_principal_is_read_only_and_invalidated(create_test_user):
+    """
+    Test that the principal snapshot cannot be mutated and is dropped from the cache, which is keyed by user id.
+    """
+    principal = UserPrincipal.from_user(create_test_user)
+    assert principal.id == create_test_user.id
+    assert not hasattr(principal, "password")
+    with pytest.raises(AttributeError):
+        principal.role = "admin"
+
+    principal_cache.set(create_test_user.id, principal)
+    invalidate_principal(create_test_user)
+    assert principal_cache.get(create_test_user.id) is None
+
+
+def test_principal_cache_follows_recreated_user(test_app, get_db_session):
+    """
+    Test that a user deleted and recreated under the same username is served with the new user id, not a cached snapshot of the old one.
+    """
+
+    def create_ghost() -> User:
+        user = User(
+            name="ghost",
+            email="ghost@example.com",
+            username="ghost",
+            password=pwd_context.hash("ghostpassword"),
+            is_verified=True,
+        )
+        get_db_session.add(user)
+        get_db_session.commit()
+        return user
+
+    def create_todo() -> dict:
+        token = test_app.post(
+            "/token", data={"username": "ghost", "password": "ghostpassword"}
+        ).json()["access_token"]
+        response = test_app.post(
+            "/todos/",
+            json={"task": "haunt"},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 201
+        return response.json()
+
+    def delete_ghost(user: User) -> None:
+        for model in (Todo, RefreshTokenFamily):
+            get_db_session.query(model).filter(model.user_id == user.id).delete()
+        get_db_session.delete(user)
+        get_db_session.commit()
+
+    first = create_ghost()
+    assert create_todo()["user_id"] == first.id
+    delete_ghost(first)
+
+    second = create_ghost()
+    try:
+        assert create_todo()["user_id"] == second.id
+    finally:
+        delete_ghost(second)
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from redis_stub import RedisStub
+
+from fastapi_todo_app import main
+from fastapi_todo_app.services.ephemeral_store import MemoryStore, RedisStore
+from fastapi_todo_app.services.two_factor import EphemeralTwoFactorCodes
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def redis_stub():
+    stub = RedisStub().start()
+    yield stub
+    stub.stop()
+
+
+def test_memory_store_expires_and_pops():
+    """
+    Test that values vanish after their TTL, that pop reads and deletes, and that only_if_absent does not overwrite live keys.
+    """
+    clock = FakeClock()
+    store = MemoryStore(clock=clock)
+
+    async def scenario():
+        assert await store.set("a", "1", ttl=10)
+        assert not await store.set("a", "2", ttl=10, only_if_absent=True)
+        assert await store.pop("a") == "1"
+        assert await store.get("a") is None
+
+        await store.set("b", "1", ttl=10)
+        clock.now += 11
+        assert await store.get("b") is None
+        assert await store.set("b", "2", ttl=10, only_if_absent=True)
+
+    asyncio.run(scenario())
+
+
+def test_redis_store_round_trip(redis_stub):
+    """
+    Test the Redis backend against a local stand-in, including reconnecting after the server drops the connection.
+    """
+    store = RedisStore(redis_stub.url)
+
+    async def scenario():
+        assert await store.set("a", "1", ttl=10)
+        assert not await store.set("a", "2", ttl=10, only_if_absent=True)
+        assert await store.get("a") == "1"
+        redis_stub.drop_connections()
+        assert await store.pop("a") == "1"
+        assert await store.get("a") is None
+        await store.close()
+
+    asyncio.run(scenario())
+    assert ["SET", "a", "1", "PX", "10000"] in redis_stub.commands
+    assert redis_stub.connections == 2
+
+
+def test_two_factor_login_with_ephemeral_store(
+    test_app, get_db_session, create_test_user, redis_stub, monkeypatch
+):
+    """
+    Test the 2FA login flow with codes and confirmations kept in the Redis backend instead of the database.
+    """
+    codes = EphemeralTwoFactorCodes(RedisStore(redis_stub.url))
+    monkeypatch.setattr(main, "two_factor_codes", codes)
+    create_test_user.is_two_factor_enabled = True
+    get_db_session.add(create_test_user)
+    get_db_session.commit()
+    credentials = {"username": "testuser", "password": "testpassword"}
+
+    response = test_app.post("/token", data=credentials)
+    assert response.json()["message"] == "2FA code sent to your email"
+    code = next(
+        key.split(":")[-1] for key in redis_stub.data if key.startswith("2fa:code:")
+    )
+
+    response = test_app.post("/two-fa-confirm", json={"two_fa_code": code})
+    assert response.status_code == 200
+    assert test_app.post("/two-fa-confirm", json={"two_fa_code": code}).status_code == 404
+
+    response = test_app.post("/token", data=credentials)
+    assert response.json()["message"] == "Login successful"
+    assert response.json()["access_token"]
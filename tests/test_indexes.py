@@ -0,0 +1,81 @@
+"""
+Checks that every hot lookup path is served by an index.
+
+Each query below mirrors a statement issued by `main.py`, `services/auth.py` or
+`router/user_router.py`. The test database is nearly empty, so the planner would
+happily pick a sequential scan anyway; with `enable_seqscan` turned off it only
+does so when no usable index exists.
+"""
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import col, select
+
+from fastapi_todo_app.models.email_outbox import EmailOutbox
+from fastapi_todo_app.models.forgot_password import ForgotPasswordModel
+from fastapi_todo_app.models.todo_model import Todo
+from fastapi_todo_app.models.two_factor_model import (
+    TwoFactorConfirmation,
+    TwoFactorToken,
+)
+from fastapi_todo_app.models.user_model import User
+from fastapi_todo_app.models.verification_model import VerificationToken
+
+from conftest import engine
+
+LOOKUPS = {
+    "user by username": select(User).where(User.username == "testuser"),
+    "user by email": select(User).where(User.email == "test@example.com"),
+    "user by id": select(User).where(User.id == 1),
+    "verification token by token": select(VerificationToken).where(
+        VerificationToken.token == "token"
+    ),
+    "verification tokens by user": select(VerificationToken).where(
+        VerificationToken.user_id == 1
+    ),
+    "reset token by token": select(ForgotPasswordModel).where(
+        ForgotPasswordModel.token == "token"
+    ),
+    "reset tokens by user": select(ForgotPasswordModel).where(
+        ForgotPasswordModel.user_id == 1
+    ),
+    "2fa token by token": select(TwoFactorToken).where(TwoFactorToken.token == "123456"),
+    "2fa tokens by user": select(TwoFactorToken).where(TwoFactorToken.user_id == 1),
+    "2fa confirmations by user": select(TwoFactorConfirmation).where(
+        TwoFactorConfirmation.user_id == 1
+    ),
+    "todo page": select(Todo)
+    .where(Todo.user_id == 1)
+    .where(Todo.id > 10)
+    .order_by(col(Todo.id))
+    .limit(51),
+    "todo by id": select(Todo).where(Todo.user_id == 1).where(Todo.id == 1),
+    "todo export": select(Todo.id, Todo.task, Todo.is_completed, Todo.user_id)
+    .where(Todo.user_id == 1)
+    .order_by(col(Todo.id)),
+    "due outbox emails": select(EmailOutbox)
+    .where(col(EmailOutbox.status).in_(("pending", "sending")))
+    .order_by(col(EmailOutbox.id))
+    .limit(50),
+}
+
+
+@pytest.mark.parametrize("name", LOOKUPS)
+def test_lookup_uses_index(name):
+    """
+    Test that a lookup query is planned without a sequential scan.
+
+    Args:
+        name (str): The key of the query in `LOOKUPS`.
+
+    Returns:
+        None
+    """
+    statement = LOOKUPS[name].compile(
+        dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+    )
+    with engine.connect() as connection:
+        connection.execute(text("SET enable_seqscan = off"))
+        plan = connection.execute(text(f"EXPLAIN {statement}")).scalars().all()
+
+    assert not any("Seq Scan" in line for line in plan), "\n".join(plan)
@@ -4,9 +4,16 @@ Imports the `TestClient` class from the `fastapi.testclient` module.
 The `TestClient` class is used to create a test client for a FastAPI application, which can be used to make HTTP requests to the application and assert the responses.
 """
 
+import csv
+import io
+import json
+
 from fastapi.testclient import TestClient
+from jose import jwt
 
 from fastapi_todo_app.main import app
+from fastapi_todo_app.schemas.todo_schema import TodoRead
+from fastapi_todo_app.services import auth
 
 
 # Test1: root endpoint
@@ -115,8 +122,66 @@ def test_get_all_todos(test_app, auth_token):
     print(f"Data: {data}")
 
     assert response.status_code == 200
-    assert len(data) > 0
-    assert any(todo["task"] == test_todo["task"] for todo in data)
+    assert len(data["items"]) > 0
+    assert any(todo["task"] == test_todo["task"] for todo in data["items"])
+
+
+def test_get_all_todos_invalid_token(test_app, auth_token):
+    """
+    Test that a malformed or forged bearer token is answered with 401, not a server error.
+
+    Args:
+        test_app (TestClient): A test client for the FastAPI application.
+        auth_token (str): An authentication token for the test user.
+
+    Returns:
+        None
+    """
+    header, payload, _ = auth_token.split(".")
+    for token in ("not.a.token", f"{header}.{payload}.Zm9yZ2Vk"):
+        response = test_app.get("/todos/", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Could not validate credentials"
+
+
+def test_get_all_todos_paginated(test_app, auth_token):
+    """
+    Test keyset pagination of the todo list.
+
+    This test case creates five todos, walks the list two at a time by following `next_cursor`, and checks that every todo is returned exactly once, in id order, and that filtering by `is_completed` only returns matching todos.
+
+    Args:
+        test_app (TestClient): A test client for the FastAPI application.
+        auth_token (str): An authentication token for the test user.
+
+    Returns:
+        None
+    """
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    created = [
+        test_app.post("/todos/", json={"task": f"Paged todo {i}"}, headers=headers).json()["id"]
+        for i in range(5)
+    ]
+    test_app.put(
+        f"/todos/{created[0]}",
+        json={"task": "Paged todo 0", "is_completed": True},
+        headers=headers,
+    )
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+        page = test_app.get("/todos/", params=params, headers=headers).json()
+        assert len(page["items"]) <= 2
+        seen.extend(todo["id"] for todo in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert [todo_id for todo_id in seen if todo_id in created] == created
+
+    response = test_app.get("/todos/", params={"is_completed": True}, headers=headers)
+    assert response.status_code == 200
+    assert all(todo["is_completed"] for todo in response.json()["items"])
 
 
 def test_get_single_todos(test_app, auth_token):
@@ -199,3 +264,191 @@ def test_delete_todo(test_app, auth_token):
     print(delete_response.content)
     data = delete_response.json()
     assert data["message"] == "Task successfully deleted"
+
+
+def test_stateless_token_rejected_after_password_change(test_app, monkeypatch):
+    """
+    Test that in stateless principal mode the access token carries uid/role/version claims, and that it stops being accepted once the password has been changed.
+
+    Args:
+        test_app (TestClient): A test client for the FastAPI application.
+        monkeypatch (MonkeyPatch): Used to switch stateless principal mode on.
+
+    Returns:
+        None
+    """
+    monkeypatch.setattr(auth, "STATELESS_PRINCIPAL", True)
+    access_token = test_app.post(
+        "/token", data={"username": "testuser", "password": "testpassword"}
+    ).json()["access_token"]
+    claims = jwt.get_unverified_claims(access_token)
+    assert {"uid", "role", "ver"} <= claims.keys()
+
+    headers = {"Authorization": f"Bearer {access_token}"}
+    response = test_app.post("/todos/", json={"task": "Stateless"}, headers=headers)
+    assert response.status_code == 201
+
+    response = test_app.post(
+        "/user/change-password",
+        json={"current_password": "testpassword", "new_password": "newpassword"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+
+    response = test_app.get("/todos/", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked. Please login again."
+
+
+def test_bulk_todos(test_app, auth_token):
+    """
+    Test that creates, patches and deletes sent to the bulk endpoint are applied together and reported per item.
+
+    Args:
+        test_app (TestClient): A test client for the FastAPI application.
+        auth_token (str): An authentication token for the test user.
+
+    Returns:
+        None
+    """
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    existing = [
+        test_app.post("/todos/", json={"task": f"Bulk todo {i}"}, headers=headers).json()["id"]
+        for i in range(2)
+    ]
+    missing_id = max(existing) + 1000
+
+    response = test_app.post(
+        "/todos/bulk",
+        json={
+            "create": [{"task": "Bulk created 1"}, {"task": "Bulk created 2"}],
+            "update": [
+                {"id": existing[0], "is_completed": True},
+                {"id": missing_id, "task": "Nobody"},
+            ],
+            "delete": [existing[1], missing_id],
+        },
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [todo["task"] for todo in data["created"]] == ["Bulk created 1", "Bulk created 2"]
+    assert data["updated"][0]["status"] == "updated"
+    assert data["updated"][0]["todo"]["is_completed"] is True
+    assert data["updated"][0]["todo"]["task"] == "Bulk todo 0"
+    assert data["updated"][1] == {"id": missing_id, "status": "not_found", "todo": None}
+    assert [item["status"] for item in data["deleted"]] == ["deleted", "not_found"]
+    assert test_app.get(f"/todos/{existing[1]}", headers=headers).status_code == 404
+
+
+def test_export_todos(test_app, auth_token):
+    """
+    Test that the export endpoint streams every todo of the current user as NDJSON or CSV.
+
+    Args:
+        test_app (TestClient): A test client for the FastAPI application.
+        auth_token (str): An authentication token for the test user.
+
+    Returns:
+        None
+    """
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    tasks = [f"Export todo, {i}" for i in range(3)]
+    test_app.post(
+        "/todos/bulk", json={"create": [{"task": task} for task in tasks]}, headers=headers
+    )
+
+    response = test_app.get("/todos/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["task"] for row in rows][-3:] == tasks
+    assert {"id", "task", "is_completed", "user_id"} == rows[0].keys()
+
+    response = test_app.get("/todos/export", params={"format": "csv"}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = list(csv.reader(io.StringIO(response.text)))
+    assert lines[0] == ["id", "task", "is_completed", "user_id"]
+    assert [line[1] for line in lines[1:]][-3:] == tasks
+
+    response = test_app.get("/todos/export", params={"format": "xml"}, headers=headers)
+    assert response.status_code == 422
+
+
+def test_todo_etags(test_app, auth_token):
+    """
+    Test that todo reads carry ETags, answer a matching If-None-Match with 304, and get new ETags once a todo changes.
+
+    Args:
+        test_app (TestClient): A test client for the FastAPI application.
+        auth_token (str): An authentication token for the test user.
+
+    Returns:
+        None
+    """
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    todo = test_app.post("/todos/", json={"task": "Poll me"}, headers=headers).json()
+
+    response = test_app.get("/todos/", headers=headers)
+    list_etag = response.headers["ETag"]
+    response = test_app.get(f"/todos/{todo['id']}", headers=headers)
+    todo_etag = response.headers["ETag"]
+
+    response = test_app.get("/todos/", headers={**headers, "If-None-Match": list_etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    # The list version is cached, so a repeated poll does not query the database
+    assert 'desc="0 queries"' in response.headers["Server-Timing"]
+    response = test_app.get(
+        f"/todos/{todo['id']}", headers={**headers, "If-None-Match": todo_etag}
+    )
+    assert response.status_code == 304
+
+    response = test_app.put(
+        f"/todos/{todo['id']}",
+        json={"task": "Poll me again", "is_completed": True},
+        headers=headers,
+    )
+    assert response.headers["ETag"] != todo_etag
+
+    response = test_app.get("/todos/", headers={**headers, "If-None-Match": list_etag})
+    assert response.status_code == 200
+    response = test_app.get(
+        f"/todos/{todo['id']}", headers={**headers, "If-None-Match": todo_etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["task"] == "Poll me again"
+
+
+def test_todo_responses_match_read_schema(test_app, auth_token):
+    """
+    Test that the todo routes, which bypass response_model validation, still return exactly the TodoRead fields.
+
+    Args:
+        test_app (TestClient): A test client for the FastAPI application.
+        auth_token (str): An authentication token for the test user.
+
+    Returns:
+        None
+    """
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    fields = set(TodoRead.model_fields)
+
+    created = test_app.post("/todos/", json={"task": "Shape check"}, headers=headers)
+    assert created.status_code == 201
+    assert created.json().keys() == fields
+    todo_id = created.json()["id"]
+
+    page = test_app.get("/todos/", headers=headers).json()
+    assert all(item.keys() == fields for item in page["items"])
+    single = test_app.get(f"/todos/{todo_id}", headers=headers).json()
+    assert TodoRead(**single).task == "Shape check"
+    updated = test_app.put(
+        f"/todos/{todo_id}",
+        json={"task": "Shape checked", "is_completed": True},
+        headers=headers,
+    ).json()
+    assert updated.keys() == fields
+    assert updated["is_completed"] is True
@@ -0,0 +1,44 @@
+from fastapi_todo_app.services.metrics import Registry
+
+
+def test_registry_renders_prometheus_text():
+    """
+    Test that counters, callback gauges and histograms render in the Prometheus text format, with cumulative buckets.
+    """
+    registry = Registry()
+    sends = registry.counter("sends_total", "Sends", ("outcome",))
+    registry.gauge("queue_depth", "Queued items", function=lambda: 3)
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+
+    sends.inc(outcome="ok")
+    sends.inc(2, outcome="ok")
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE sends_total counter" in lines
+    assert 'sends_total{outcome="ok"} 3' in lines
+    assert "queue_depth 3" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_count 3" in lines
+    assert latency.count() == 3
+
+
+def test_metrics_endpoint(test_app, auth_token):
+    """
+    Test that /metrics reports request latency by route template along with the auth-path timings.
+    """
+    test_app.get("/todos/", headers={"Authorization": f"Bearer {auth_token}"})
+
+    response = test_app.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/todos/"' in body
+    assert "password_verify_duration_seconds_count" in body
+    assert "jwt_claims_cache_misses_total" in body
+    assert "db_pool_checkout_wait_seconds_count" in body
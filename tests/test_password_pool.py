@@ -0,0 +1,53 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from fastapi_todo_app.services.auth import hash_password, verify_password
+from fastapi_todo_app.services.password_pool import PasswordWorkerPool
+
+
+def test_password_pool_hash_and_verify():
+    """
+    Test that hashing and verification run on the worker pool and are timed.
+    """
+    pool = PasswordWorkerPool(kind="thread", max_workers=2, max_pending=4)
+
+    async def run():
+        hashed = await pool.run(hash_password, "testpassword")
+        return await pool.run(verify_password, "testpassword", hashed)
+
+    try:
+        assert asyncio.run(run()) is True
+    finally:
+        pool.shutdown()
+    stats = pool.stats()
+    assert stats["calls"] == 2
+    assert stats["pending"] == 0
+    assert stats["max_ms"] > 0
+
+
+def test_password_pool_rejects_when_queue_is_full():
+    """
+    Test that calls beyond the pending limit fail fast with a 503 instead of queueing.
+    """
+    pool = PasswordWorkerPool(kind="thread", max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def run():
+        blocked = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as exc_info:
+            await pool.run(hash_password, "testpassword")
+        release.set()
+        await blocked
+        return exc_info.value
+
+    try:
+        error = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert error.status_code == 503
+    assert error.headers == {"Retry-After": "1"}
+    assert pool.rejected == 1
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from redis_stub import RedisStub
+
+from fastapi_todo_app import main
+from fastapi_todo_app.services.ephemeral_store import MemoryStore, RedisStore
+from fastapi_todo_app.services.rate_limit import (
+    Rate,
+    SlidingWindowLimiter,
+    per_account,
+    rate_limiter,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 6000.0
+
+    def __call__(self):
+        return self.now
+
+
+def hits(limiter: SlidingWindowLimiter, count: int, rate: Rate) -> list:
+    async def run():
+        return [await limiter.hit("key", rate) for _ in range(count)]
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_sliding_window_limits_and_recovers(backend):
+    """
+    Test that the limiter allows `limit` hits per window, reports how long to wait, and lets traffic through again once the window has slid on.
+    """
+    clock = FakeClock()
+    stub = None
+    if backend == "redis":
+        stub = RedisStub().start()
+        store = RedisStore(stub.url)
+    else:
+        store = MemoryStore()
+    limiter = SlidingWindowLimiter(store, clock=clock)
+    rate = Rate.parse("3/60")
+
+    try:
+        results = hits(limiter, 4, rate)
+        assert results[:3] == [None, None, None]
+        assert results[3] == 60
+
+        # Half of the previous window still counts: 4 * 0.5 + 1 <= 3
+        clock.now += 90
+        assert hits(limiter, 1, rate) == [None]
+        clock.now += 120
+        assert hits(limiter, 3, rate) == [None, None, None]
+    finally:
+        if stub is not None:
+            stub.stop()
+
+
+def test_token_endpoint_answers_429_before_authenticating(test_app, monkeypatch):
+    """
+    Test that once an account's login budget is spent, /token answers 429 with Retry-After without trying to authenticate.
+    """
+    monkeypatch.setattr(rate_limiter, "enabled", True)
+    monkeypatch.setattr(rate_limiter, "store", MemoryStore())
+    credentials = {"username": "testuser", "password": "wrongpassword"}
+    for _ in range(per_account.limit):
+        assert test_app.post("/token", data=credentials).status_code == 401
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("authenticate_user must not run")
+
+    monkeypatch.setattr(main, "authenticate_user", fail)
+    response = test_app.post("/token", data=credentials)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
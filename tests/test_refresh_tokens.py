@@ -0,0 +1,102 @@
+import asyncio
+
+from jose import jwt
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from conftest import async_engine
+from fastapi_todo_app import settings
+from fastapi_todo_app.models.refresh_token_family import RefreshTokenFamily
+from fastapi_todo_app.services.refresh_tokens import RevocationList, revocation_list
+
+
+def login(test_app) -> str:
+    response = test_app.post(
+        "/token", data={"username": "testuser", "password": "testpassword"}
+    )
+    return response.json()["refresh_token"]
+
+
+def refresh(test_app, token: str):
+    return test_app.post("/token/refresh", params={"old_refresh_token": token})
+
+
+def test_refresh_rotates_and_rejects_replay(test_app, get_db_session):
+    """
+    Test that each refresh returns a new refresh token, and that presenting an already used one revokes the whole family.
+    """
+    first = login(test_app)
+    response = refresh(test_app, first)
+    assert response.status_code == 200
+    second = response.json()["refresh_token"]
+    assert second != first
+    family_id = jwt.get_unverified_claims(second)["fam"]
+    assert jwt.get_unverified_claims(first)["fam"] == family_id
+
+    # Replaying the first token revokes the family, so the second dies too
+    assert refresh(test_app, first).status_code == 401
+    assert family_id in revocation_list
+    assert refresh(test_app, second).status_code == 401
+
+    family = get_db_session.exec(
+        select(RefreshTokenFamily).where(RefreshTokenFamily.id == family_id)
+    ).one()
+    get_db_session.refresh(family)
+    assert family.revoked_at is not None
+
+    # A fresh login starts a new, working family
+    assert refresh(test_app, login(test_app)).status_code == 200
+
+
+def test_refresh_accepts_tokens_issued_before_rotation_once(
+    test_app, create_test_user
+):
+    """
+    Test that a refresh token without a family works once and is moved onto a new family, and that exchanging it again fails.
+    """
+    legacy = jwt.encode(
+        {"sub": create_test_user.email, "exp": 4102444800},
+        str(settings.SECRET_KEY),
+        algorithm=str(settings.ALGORITHM),
+    )
+
+    response = refresh(test_app, legacy)
+
+    assert response.status_code == 200
+    claims = jwt.get_unverified_claims(response.json()["refresh_token"])
+    assert "fam" in claims and claims["typ"] == "refresh"
+    assert refresh(test_app, legacy).status_code == 401
+
+
+def test_refresh_rejects_access_tokens(test_app):
+    """
+    Test that an access token cannot be exchanged for a refresh token, and that a refresh token is not accepted as an access token.
+    """
+    tokens = test_app.post(
+        "/token", data={"username": "testuser", "password": "testpassword"}
+    ).json()
+
+    assert refresh(test_app, tokens["access_token"]).status_code == 401
+    response = test_app.get(
+        "/todos/", headers={"Authorization": f"Bearer {tokens['refresh_token']}"}
+    )
+    assert response.status_code == 401
+
+
+def test_revocation_list_syncs_from_other_workers(test_app):
+    """
+    Test that a worker learns about a family revoked elsewhere on its next sync.
+    """
+    first = login(test_app)
+    second = refresh(test_app, first).json()["refresh_token"]
+    family_id = jwt.get_unverified_claims(second)["fam"]
+    other_worker = RevocationList(
+        session_factory=lambda: AsyncSession(async_engine, expire_on_commit=False)
+    )
+    asyncio.run(other_worker.sync())
+    assert family_id not in other_worker
+
+    assert refresh(test_app, first).status_code == 401
+    asyncio.run(other_worker.sync())
+
+    assert family_id in other_worker
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import JWTError, jwk, jwt
+
+from fastapi_todo_app import main
+from fastapi_todo_app.services.signing_keys import KeyRing
+from fastapi_todo_app.services.token_codec import create_codec
+
+
+def rsa_key_pair() -> tuple[str, str]:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public_pem = (
+        private_key.public_key()
+        .public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        .decode()
+    )
+    return private_pem, public_pem
+
+
+def test_rotated_key_ring_still_verifies_old_tokens():
+    """
+    Test that after a key rotation new tokens carry the new kid, tokens signed with the retired key still verify, and both public keys (and no private material) are published.
+    """
+    old_private, old_public = rsa_key_pair()
+    new_private, _ = rsa_key_pair()
+    old_ring = KeyRing("RS256", private_key_pem=old_private)
+    old_token = create_codec(old_ring).encode({"sub": "test@example.com"})
+    ring = KeyRing(
+        "RS256", private_key_pem=new_private, retired_public_key_pems=[old_public]
+    )
+    codec = create_codec(ring)
+    new_token = codec.encode({"sub": "test@example.com"})
+
+    assert jwt.get_unverified_header(old_token)["kid"] == old_ring.kid
+    assert jwt.get_unverified_header(new_token)["kid"] == ring.kid != old_ring.kid
+    assert codec.decode(old_token)["sub"] == "test@example.com"
+    assert codec.decode(new_token)["sub"] == "test@example.com"
+    # Dropping the retired key from the ring retires its tokens
+    with pytest.raises(JWTError):
+        create_codec(KeyRing("RS256", private_key_pem=new_private)).decode(old_token)
+
+    keys = json.loads(ring.jwks_json)["keys"]
+    assert [key["kid"] for key in keys] == [ring.kid, old_ring.kid]
+    assert all("d" not in key for key in keys)
+    # A consumer needs nothing but the published key to verify
+    published = jwk.construct(keys[0], "RS256")
+    assert jwt.decode(new_token, published, algorithms=["RS256"])["sub"]
+
+
+def test_jwks_endpoint_is_cacheable(test_app, monkeypatch):
+    """
+    Test that /.well-known/jwks.json publishes the public keys with an ETag and answers 304 to a matching If-None-Match.
+    """
+    private_pem, _ = rsa_key_pair()
+    ring = KeyRing("RS256", private_key_pem=private_pem)
+    monkeypatch.setattr(main, "key_ring", ring)
+
+    response = test_app.get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert response.json()["keys"][0]["kid"] == ring.kid
+    assert "max-age" in response.headers["Cache-Control"]
+    etag = response.headers["ETag"]
+
+    response = test_app.get("/.well-known/jwks.json", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_jwks_is_empty_for_shared_secrets():
+    """
+    Test that an HMAC key ring signs without a kid and never publishes the secret.
+    """
+    ring = KeyRing("HS256", secret="not-for-publishing")
+
+    token = create_codec(ring).encode({"sub": "x"})
+
+    assert "kid" not in jwt.get_unverified_header(token)
+    assert json.loads(ring.jwks_json) == {"keys": []}
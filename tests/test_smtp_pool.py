@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from smtp_sink import SMTPSink
+
+from fastapi_todo_app.services.smtp_pool import SMTPConnectionPool
+
+
+@pytest.fixture
+def smtp_sink():
+    sink = SMTPSink().start()
+    yield sink
+    sink.stop()
+
+
+def make_pool(sink: SMTPSink, **kwargs) -> SMTPConnectionPool:
+    return SMTPConnectionPool(
+        host=sink.host, port=sink.port, use_starttls=False, **kwargs
+    )
+
+
+def test_smtp_pool_reuses_connections(smtp_sink):
+    """
+    Test that several messages are delivered over a single warm connection.
+    """
+    pool = make_pool(smtp_sink, size=1)
+
+    async def send_all():
+        for i in range(3):
+            await pool.send("from@example.com", "to@example.com", f"Subject: {i}\r\n\r\nhi")
+
+    asyncio.run(send_all())
+    pool.close()
+
+    assert len(smtp_sink.messages) == 3
+    assert smtp_sink.connections == 1
+    assert pool.connections_opened == 1
+
+
+def test_smtp_pool_reconnects_after_server_drop(smtp_sink):
+    """
+    Test that a connection dropped by the server is replaced transparently on the next send.
+    """
+    pool = make_pool(smtp_sink, size=1)
+    pool.send_sync("from@example.com", "to@example.com", "Subject: 1\r\n\r\nhi")
+    smtp_sink.drop_connections()
+    pool.send_sync("from@example.com", "to@example.com", "Subject: 2\r\n\r\nhi")
+    pool.close()
+
+    assert len(smtp_sink.messages) == 2
+    assert pool.connections_opened == 2
+
+
+def test_smtp_pool_health_checks_idle_connections(smtp_sink):
+    """
+    Test that a connection idle past the health check interval is probed and replaced if dead.
+    """
+    pool = make_pool(smtp_sink, size=1, health_check_interval=0)
+    pool.send_sync("from@example.com", "to@example.com", "Subject: 1\r\n\r\nhi")
+    smtp_sink.drop_connections()
+    pool.send_sync("from@example.com", "to@example.com", "Subject: 2\r\n\r\nhi")
+    pool.close()
+
+    assert len(smtp_sink.messages) == 2
+    assert smtp_sink.connections == 2
+
+
+def test_smtp_pool_discards_connection_after_unexpected_error(smtp_sink):
+    """
+    Test that an error other than an SMTP or socket one closes the connection instead of leaving it open outside the pool.
+    """
+    pool = make_pool(smtp_sink, size=1)
+    pool.send_sync("from@example.com", "to@example.com", "Subject: 1\r\n\r\nhi")
+    server, _ = pool._idle[-1]
+
+    with pytest.raises(UnicodeEncodeError):
+        pool.send_sync("from@example.com", "to@example.com", "Subject: café\r\n\r\nhi")
+    assert server.sock is None
+    assert not pool._idle
+
+    pool.send_sync("from@example.com", "to@example.com", "Subject: 2\r\n\r\nhi")
+    pool.close()
+
+    assert len(smtp_sink.messages) == 2
+    assert pool.connections_opened == 2
@@ -0,0 +1,62 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from fastapi_todo_app.services.sql_instrumentation import query_monitor
+
+
+def test_monitor_counts_statements_and_flags_repeats(caplog, monkeypatch):
+    """
+    Test that statements run inside track() are counted and timed, that one statement repeated past the threshold is reported as a possible N+1, and that slow statements are logged.
+    """
+    # The hooks are installed on every Engine, so a throwaway SQLite engine
+    # is instrumented too
+    monkeypatch.setattr(query_monitor, "slow_query_ms", 10_000)
+    monkeypatch.setattr(query_monitor, "n_plus_one_threshold", 5)
+    engine = create_engine("sqlite://")
+    caplog.set_level(logging.WARNING, logger="fastapi_todo_app.services.sql_instrumentation")
+
+    with engine.connect() as conn, query_monitor.track("/loop") as stats:
+        for i in range(6):
+            conn.execute(text("SELECT :i"), {"i": i})
+        conn.execute(text("SELECT 1"))
+
+    assert stats.statements == 7
+    assert stats.seconds > 0
+    assert 'desc="7 queries"' in stats.server_timing()
+    assert any("Possible N+1 in /loop" in r.message for r in caplog.records)
+    assert not any("Slow query" in r.message for r in caplog.records)
+
+    monkeypatch.setattr(query_monitor, "slow_query_ms", 0)
+    with engine.connect() as conn, query_monitor.track("/slow"):
+        conn.execute(text("SELECT 2"))
+    assert any("Slow query" in r.message and "/slow" in r.message for r in caplog.records)
+
+
+def test_monitor_survives_failing_statements():
+    """
+    Test that a statement that raises leaves no timing state on the pooled connection, and that the statements after it are timed as usual.
+    """
+    engine = create_engine("sqlite://")
+
+    with engine.connect() as conn, query_monitor.track("/error") as stats:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        conn.execute(text("SELECT 1"))
+        assert "query_start" not in conn.info
+
+    assert stats.statements == 1
+    assert stats.seconds < 1
+
+
+def test_server_timing_header(test_app, auth_token):
+    """
+    Test that responses report the request's database time and statement count.
+    """
+    response = test_app.get("/todos/", headers={"Authorization": f"Bearer {auth_token}"})
+
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("db;dur=")
+    assert "queries" in timing and 'desc="0 queries"' not in timing
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from jose import JWTError
+from jose.exceptions import ExpiredSignatureError
+from test_signing_keys import rsa_key_pair
+
+from fastapi_todo_app.services.signing_keys import KeyRing
+from fastapi_todo_app.services.token_codec import create_codec
+
+
+@pytest.fixture(params=["HS256", "RS256"])
+def key_ring(request):
+    if request.param == "HS256":
+        return KeyRing("HS256", secret="codec-test-secret-of-a-decent-length!")
+    private_pem, _ = rsa_key_pair()
+    return KeyRing("RS256", private_key_pem=private_pem)
+
+
+@pytest.fixture(params=["jose", "pyjwt"])
+def backend(request):
+    if request.param == "pyjwt":
+        pytest.importorskip("jwt")
+    return request.param
+
+
+def test_codec_round_trip_and_errors(key_ring, backend):
+    """
+    Test that every backend verifies its own tokens and reports expired and tampered tokens with python-jose's exceptions.
+    """
+    codec = create_codec(key_ring, backend)
+    expires = datetime.now(timezone.utc) + timedelta(minutes=5)
+
+    token = codec.encode({"sub": "test@example.com", "exp": expires})
+    assert codec.decode(token)["sub"] == "test@example.com"
+
+    expired = codec.encode({"sub": "test@example.com", "exp": expires - timedelta(hours=1)})
+    with pytest.raises(ExpiredSignatureError):
+        codec.decode(expired)
+    with pytest.raises(JWTError):
+        codec.decode(token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB"))
+
+
+def test_backends_read_each_others_tokens(key_ring):
+    """
+    Test that switching JWT_BACKEND does not invalidate tokens already issued.
+    """
+    pytest.importorskip("jwt")
+    jose_codec = create_codec(key_ring, "jose")
+    pyjwt_codec = create_codec(key_ring, "pyjwt")
+    claims = {"sub": "test@example.com", "exp": datetime.now(timezone.utc) + timedelta(minutes=5)}
+
+    assert pyjwt_codec.decode(jose_codec.encode(claims))["sub"] == "test@example.com"
+    assert jose_codec.decode(pyjwt_codec.encode(claims))["sub"] == "test@example.com"
@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlmodel import select
+
+from conftest import async_engine, engine
+from fastapi_todo_app.models.email_outbox import EmailOutbox
+from fastapi_todo_app.models.forgot_password import ForgotPasswordModel
+from fastapi_todo_app.models.user_model import User
+from fastapi_todo_app.models.verification_model import VerificationToken
+from fastapi_todo_app.services.token_sweeper import SWEEP_LOCK_KEY, TokenSweeper
+
+
+def test_sweeper_purges_only_expired_tokens(get_db_session, create_test_user):
+    """
+    Test that a sweep deletes expired verification and reset tokens in batches and keeps live ones.
+    """
+    # Each user holds at most one token per table, so spread them over users
+    users = [
+        User(
+            name=f"sweep {i}",
+            email=f"sweep{i}@example.com",
+            username=f"sweep{i}",
+            password="x" * 60,
+        )
+        for i in range(5)
+    ]
+    get_db_session.add_all(users)
+    get_db_session.commit()
+
+    now = datetime.now()
+    for i, user in enumerate(users):
+        get_db_session.add(
+            VerificationToken(
+                token=f"expired-{i}",
+                user_id=user.id,
+                expires_at=now - timedelta(hours=1),
+            )
+        )
+    get_db_session.add(
+        VerificationToken(
+            token="live", user_id=create_test_user.id, expires_at=now + timedelta(hours=1)
+        )
+    )
+    get_db_session.add(
+        ForgotPasswordModel(
+            token="expired-reset",
+            user_id=create_test_user.id,
+            expires_at=datetime.now(timezone.utc) - timedelta(minutes=1),
+        )
+    )
+    get_db_session.commit()
+
+    try:
+        purged = asyncio.run(
+            TokenSweeper(engine=async_engine, batch_size=2).sweep_once()
+        )
+
+        assert purged["email_verification_tokens"] == 5
+        assert purged["forgot_password_tokens"] == 1
+        remaining = get_db_session.exec(select(VerificationToken.token)).all()
+        assert remaining == ["live"]
+    finally:
+        user_ids = [user.id for user in users]
+        get_db_session.query(VerificationToken).filter(
+            VerificationToken.user_id.in_(user_ids)
+        ).delete()
+        get_db_session.query(User).filter(User.id.in_(user_ids)).delete()
+        get_db_session.commit()
+
+
+def test_sweeper_purges_finished_outbox_emails_after_retention(
+    get_db_session, create_test_user
+):
+    """
+    Test that a sweep deletes sent, superseded and failed emails once they are past the retention period, and keeps emails still waiting to be sent.
+    """
+    long_ago = datetime.now(timezone.utc) - timedelta(days=30)
+    for status in ("sent", "superseded", "failed", "pending", "sending"):
+        get_db_session.add(
+            EmailOutbox(
+                kind="verification",
+                to_email=create_test_user.email,
+                token=status,
+                user_id=create_test_user.id,
+                status=status,
+                next_attempt_at=long_ago,
+            )
+        )
+    get_db_session.add(
+        EmailOutbox(
+            kind="verification",
+            to_email=create_test_user.email,
+            token="recent",
+            user_id=create_test_user.id,
+            status="sent",
+        )
+    )
+    get_db_session.commit()
+
+    purged = asyncio.run(TokenSweeper(engine=async_engine).sweep_once())
+
+    assert purged["email_outbox"] == 3
+    remaining = get_db_session.exec(
+        select(EmailOutbox.token).where(EmailOutbox.user_id == create_test_user.id)
+    ).all()
+    assert sorted(remaining) == ["pending", "recent", "sending"]
+
+
+def test_sweeper_skips_pass_while_another_worker_holds_the_lock():
+    """
+    Test that a sweep does nothing while another connection holds the advisory lock.
+    """
+    with engine.connect() as connection:
+        connection.execute(
+            text("SELECT pg_advisory_lock(:key)"), {"key": SWEEP_LOCK_KEY}
+        )
+        try:
+            purged = asyncio.run(TokenSweeper(engine=async_engine).sweep_once())
+        finally:
+            connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": SWEEP_LOCK_KEY}
+            )
+
+    assert purged is None
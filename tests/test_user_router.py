@@ -1,3 +1,14 @@
+import asyncio
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from conftest import async_engine
+from fastapi_todo_app.models.email_outbox import EmailOutbox
+from fastapi_todo_app.models.forgot_password import ForgotPasswordModel
+from fastapi_todo_app.services.auth import lookup_user, lookup_users
+
+
 def test_user_root(test_app):
     """
     Test the root endpoint for the user API.
@@ -88,3 +99,73 @@ def test_get_user_profile_invalid_token(test_app):
     )
     assert response.status_code == 401
     assert response.json()["detail"] == "Could not validate credentials"
+
+
+def test_forgot_password_queues_email_in_outbox(test_app, get_db_session, create_test_user):
+    """
+    Test that requesting a password reset returns without talking to SMTP and leaves the email queued in the outbox.
+
+    The outbox row must be committed together with the reset token, so it carries the same token the user will receive.
+    """
+    response = test_app.post(
+        "/user/forgot-password", params={"email": create_test_user.email}
+    )
+    assert response.status_code == 200
+
+    get_db_session.expire_all()
+    queued = get_db_session.exec(
+        select(EmailOutbox)
+        .where(EmailOutbox.user_id == create_test_user.id)
+        .where(EmailOutbox.kind == "forgot_password")
+    ).all()
+    assert len(queued) == 1
+    assert queued[0].to_email == create_test_user.email
+    # The dispatcher blanks the token once the email has gone out
+    assert queued[0].token or queued[0].status == "sent"
+
+
+def test_forgot_password_replaces_previous_token(test_app, get_db_session, create_test_user):
+    """
+    Test that requesting a password reset twice leaves a single, usable reset token that can only be consumed once.
+    """
+    for _ in range(2):
+        response = test_app.post(
+            "/user/forgot-password", params={"email": create_test_user.email}
+        )
+        assert response.status_code == 200
+
+    get_db_session.expire_all()
+    tokens = get_db_session.exec(
+        select(ForgotPasswordModel).where(
+            ForgotPasswordModel.user_id == create_test_user.id
+        )
+    ).all()
+    assert len(tokens) == 1
+
+    request = {"token": tokens[0].token, "new_password": "testpassword"}
+    assert test_app.post("/user/reset-password", json=request).status_code == 200
+    assert test_app.post("/user/reset-password", json=request).status_code == 400
+
+
+def test_lookup_users_by_username_or_email(create_test_user):
+    """
+    Test that users are resolved by username or email in one query each, reporting which field matched.
+    """
+
+    async def resolve():
+        async with AsyncSession(async_engine) as session:
+            single = await lookup_user(
+                session, username=create_test_user.email, email=create_test_user.email
+            )
+            batch = await lookup_users(
+                session, ["testuser", "test@example.com", "nobody"]
+            )
+        return single, batch
+
+    single, batch = asyncio.run(resolve())
+
+    assert single.matched == "email"
+    assert single.user.username == "testuser"
+    assert batch.keys() == {"testuser", "test@example.com"}
+    assert batch["testuser"].matched == "username"
+    assert batch["test@example.com"].matched == "email"